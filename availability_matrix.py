@@ -0,0 +1,125 @@
+"""NumPy bitmap of worker availability for vectorized eligibility and coverage"""
+import numpy as np
+
+from engine import DAYS
+
+
+class AvailabilityMatrix:
+    """Boolean matrix of shape (workers, 7 days, time slots)
+
+    A slot is marked only when the worker is free for all of it, and a
+    shift needs every slot it touches, so when times do not line up with
+    the slot size the matrix errs on the side of "not available". Several
+    windows on the same day are merged in the matrix, which is right for
+    headcounts, but eligible checks each window on its own: as in greedy,
+    9-12 plus 12-5 does not cover 10-2.
+    """
+
+    def __init__(self, availability_data, slot_minutes=15):
+        if slot_minutes <= 0 or (24 * 60) % slot_minutes:
+            raise ValueError(f"Slot size must divide a day evenly, got {slot_minutes} minutes")
+
+        self.slot_minutes = slot_minutes
+        self.slots = (24 * 60) // slot_minutes
+
+        # worker details in first-seen order, one matrix row each
+        self.worker_ids = []
+        self.names = []
+        self.work_study = []
+        row_of = {}
+        rows, days, starts, ends = [], [], [], []
+        for worker_id, fname, lname, work_study, day, start, end in availability_data:
+            if worker_id not in row_of:
+                row_of[worker_id] = len(self.worker_ids)
+                self.worker_ids.append(worker_id)
+                self.names.append(f"{fname} {lname}")
+                self.work_study.append(bool(work_study))
+            if day in DAYS:
+                rows.append(row_of[worker_id])
+                days.append(DAYS.index(day))
+                starts.append(start)
+                ends.append(end)
+
+        self.row_of = row_of
+        self.work_study = np.array(self.work_study, dtype=bool)
+
+        # window slots shrink inward: first whole slot to last whole slot
+        rows = np.array(rows, dtype=np.intp)
+        days = np.array(days, dtype=np.intp)
+        first = -(-np.array(starts, dtype=np.int64) // slot_minutes)
+        last = np.array(ends, dtype=np.int64) // slot_minutes
+        keep = first < last
+
+        # each window kept as its own slot range for eligible, sorted by day and worker
+        by_day = np.lexsort((rows[keep], days[keep]))
+        self.window_rows = rows[keep][by_day]
+        self.window_days = days[keep][by_day]
+        self.window_first = first[keep][by_day]
+        self.window_last = last[keep][by_day]
+        self.day_bounds = np.searchsorted(self.window_days, np.arange(8))
+
+        # mark every window with +1/-1 at its edges and integrate along the day
+        edges = np.zeros((len(self.worker_ids), 7, self.slots + 1), dtype=np.int32)
+        np.add.at(edges, (rows[keep], days[keep], first[keep]), 1)
+        np.add.at(edges, (rows[keep], days[keep], last[keep]), -1)
+        self.matrix = np.cumsum(edges, axis=2)[:, :, :self.slots] > 0
+
+    def shift_slots(self, start, end):
+        """Slot range [first, last) touched by a shift given in minutes"""
+        return start // self.slot_minutes, -(-end // self.slot_minutes)
+
+    def eligible(self, shifts_data):
+        """Boolean array (shifts, workers): True where one of the worker's windows covers the shift
+
+        Rather than looping over shifts, each day's shifts are compared with
+        that day's windows in one broadcast, and the windows of each worker
+        are then OR-ed together.
+        """
+        if not len(shifts_data) or not len(self.worker_ids):
+            return np.zeros((len(shifts_data), len(self.worker_ids)), dtype=bool)
+
+        days = np.array([DAYS.index(day) for day, start, end, positions in shifts_data], dtype=np.intp)
+        starts = np.array([start for day, start, end, positions in shifts_data], dtype=np.int64)
+        ends = np.array([end for day, start, end, positions in shifts_data], dtype=np.int64)
+        first = np.clip(starts // self.slot_minutes, 0, self.slots)
+        last = np.clip(-(-ends // self.slot_minutes), 0, self.slots)
+
+        eligible = np.zeros((len(shifts_data), len(self.worker_ids)), dtype=bool)
+        for day in range(7):
+            on_day = np.flatnonzero(days == day)
+            lo, hi = self.day_bounds[day], self.day_bounds[day + 1]
+            if not len(on_day) or lo == hi:
+                continue
+            covers = ((self.window_first[lo:hi] <= first[on_day, None])
+                      & (self.window_last[lo:hi] >= last[on_day, None]))
+            # first window of each worker; a worker's windows are next to each other
+            rows = self.window_rows[lo:hi]
+            firsts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            eligible[np.ix_(on_day, rows[firsts])] = np.logical_or.reduceat(covers, firsts, axis=1)
+        return eligible & (last > first)[:, None]
+
+    def headcount(self):
+        """Number of available workers per (day, slot)"""
+        return self.matrix.sum(axis=0)
+
+
+def assign_greedy(shifts_data, availability_data, slot_minutes=15):
+    """Greedy assignment using the matrix for eligibility
+
+    Same ranking as engine.assign_shifts (work study first), returning
+    (shift index, worker id, name) tuples.
+    """
+    matrix = AvailabilityMatrix(availability_data, slot_minutes)
+    eligible = matrix.eligible(shifts_data)
+
+    # rank once: work study first, then by name (same order as the greedy engine)
+    order = sorted(range(len(matrix.worker_ids)),
+                   key=lambda r: (matrix.work_study[r], matrix.names[r]), reverse=True)
+    order = np.array(order, dtype=np.intp)
+
+    assignments = []
+    for i, (day, start, end, positions) in enumerate(shifts_data):
+        ranked = order[eligible[i][order]][:positions]
+        for r in ranked:
+            assignments.append((i, matrix.worker_ids[r], matrix.names[r]))
+    return assignments
@@ -0,0 +1,112 @@
+"""Fair shift assignment with priority queues
+
+Shifts are filled in time order. Each distinct shift window (day, start,
+end) keeps a heap of its eligible workers keyed on
+
+    (priority class, reached preferred_shifts, minutes assigned, name, id)
+
+so every position goes to the work study student, then the worker below
+their preferred number of shifts, with the fewest hours so far. Keys
+only grow as a worker is assigned, so heaps are updated lazily: an entry
+whose key is out of date is pushed back with its current key when it
+reaches the top. Each assignment costs O(log W).
+"""
+import heapq
+
+from engine import DAYS
+from interval_index import build_day_indexes
+
+
+def assign_balanced(shifts_data, availability_data, limits=None, max_shifts=None, max_hours=None,
+                    check=None):
+    """Assign workers to shifts spreading the hours evenly, work study students first
+
+    Takes the same rows as engine.assign_shifts and returns a list of
+    (shift index, worker id, name) tuples. limits maps worker id to
+    (preferred_shifts, max_hours); a worker's own max_hours overrides
+    the max_hours given here. Nobody is booked twice at the same time.
+    check, if given, is called before each shift and may raise
+    (tasks.Cancelled) to stop.
+    """
+    limits = limits or {}
+
+    windows_by_day = {}
+    workers = {}
+    for worker_id, fname, lname, work_study, day, start, end in availability_data:
+        windows_by_day.setdefault(day, []).append((start, end, worker_id))
+        workers[worker_id] = (f"{fname} {lname}", 0 if work_study else 1)
+
+    indexes = build_day_indexes(windows_by_day)
+
+    minutes = dict.fromkeys(workers, 0)
+    shifts = dict.fromkeys(workers, 0)
+    booked = {}
+
+    target = {}
+    cap = {}
+    for worker_id in workers:
+        preferred, own_max_hours = limits.get(worker_id, (0, None))
+        target[worker_id] = preferred or 0
+        hours = own_max_hours if own_max_hours is not None else max_hours
+        cap[worker_id] = hours * 60 if hours is not None else None
+
+    def key(worker_id):
+        name, priority = workers[worker_id]
+        reached = 1 if target[worker_id] and shifts[worker_id] >= target[worker_id] else 0
+        return (priority, reached, minutes[worker_id], name, worker_id)
+
+    day_order = {day: n for n, day in enumerate(DAYS)}
+    order = sorted(range(len(shifts_data)),
+                   key=lambda i: (day_order.get(shifts_data[i][0], len(DAYS)),
+                                  shifts_data[i][1], shifts_data[i][2]))
+
+    heaps = {}
+    assignments = []
+
+    for i in order:
+        if check:
+            check()
+        day, start, end, positions = shifts_data[i]
+        if day not in indexes or positions <= 0:
+            continue
+
+        window = (day, start, end)
+        heap = heaps.get(window)
+        if heap is None:
+            heap = [(key(worker_id), worker_id) for worker_id in set(indexes[day].covering(start, end))]
+            heapq.heapify(heap)
+            heaps[window] = heap
+
+        length = end - start
+        filled = 0
+        busy = []
+        while heap and filled < positions:
+            entry_key, worker_id = heapq.heappop(heap)
+
+            current = key(worker_id)
+            if entry_key != current:
+                heapq.heappush(heap, (current, worker_id))
+                continue
+
+            # over a cap now means over it for good at this length, so drop the entry
+            if max_shifts is not None and shifts[worker_id] >= max_shifts:
+                continue
+            if cap[worker_id] is not None and minutes[worker_id] + length > cap[worker_id]:
+                continue
+
+            if any(s < end and start < e for s, e in booked.get((worker_id, day), ())):
+                busy.append((entry_key, worker_id))
+                continue
+
+            # assigned to this window, so it cannot take it again
+            minutes[worker_id] += length
+            shifts[worker_id] += 1
+            booked.setdefault((worker_id, day), []).append((start, end))
+            assignments.append((i, worker_id, workers[worker_id][0]))
+            filled += 1
+
+        for entry in busy:
+            heapq.heappush(heap, entry)
+
+    assignments.sort()
+    return assignments
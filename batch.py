@@ -0,0 +1,171 @@
+"""Generate schedules for many workplaces at once on a process pool
+
+Each worker process opens the database read-only and reads one
+workplace's shifts and availability inside a single read transaction,
+so it works from a consistent snapshot even while the GUI writes (WAL).
+Only the parent process writes: every result is saved in one
+transaction at the end.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+import multiprocessing
+import os
+import pathlib
+import sqlite3
+
+import db
+import engine
+import instrument
+import validator
+
+# the connection of a pool process, opened by _init_worker
+_snapshot = None
+
+
+def open_snapshot(db_file):
+    """Open db_file read-only; queries inside one transaction see one snapshot"""
+    uri = pathlib.Path(os.path.abspath(db_file)).as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True)
+    conn.execute('PRAGMA query_only = ON')
+    conn.execute(f'PRAGMA busy_timeout = {db.BUSY_TIMEOUT}')
+    return conn
+
+
+def _init_worker(db_file):
+    global _snapshot
+    _snapshot = open_snapshot(db_file)
+
+
+def _schedule_one(workplace, start_date, end_date, cache, options):
+    """Load one workplace from the snapshot and assign its dates
+
+    Returns (workplace id, fingerprint, DaySchedules, whether they were
+    computed rather than found in the cache, validator.ValidationReport).
+    """
+    conn = _snapshot
+    with instrument.span('load'):
+        conn.execute('BEGIN')
+        try:
+            workplace_id = engine.get_workplace_id(conn, workplace)
+            shifts_data, availability_data = engine.load_inputs(conn, workplace_id)
+            exceptions = engine.load_exceptions(conn, workplace_id, start_date, end_date)
+            if options.get('mode') == 'balanced':
+                options = dict(options, limits=engine.load_limits(conn, workplace_id))
+            key = engine.fingerprint(shifts_data, availability_data, exceptions,
+                                     start_date, end_date, options)
+            days = engine.cached_range(conn, workplace_id, key) if cache else None
+            hours = validator.load_hours(conn, workplace_id)
+        finally:
+            conn.execute('COMMIT')
+    instrument.count('rows read', len(shifts_data) + len(availability_data))
+
+    computed = days is None
+    if computed:
+        with instrument.span('assign'):
+            days = engine.assign_range(shifts_data, availability_data, start_date, end_date,
+                                       exceptions, **options)
+
+    with instrument.span('validate'):
+        report = validator.validate(days, availability_data, hours)
+
+    return workplace_id, key, days, computed, report
+
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+
+def generate_many(db_file, workplaces, start_date, end_date=None, save=False, cache=True,
+                  jobs=None, progress=None, **options):
+    """Generate schedules for several workplaces in parallel
+
+    Covers start_date to end_date inclusive (default: one week). jobs is
+    the number of processes (default: one per CPU). options go to
+    engine.assign_shifts. Returns (schedules, errors, reports): the
+    engine.DaySchedule list of each workplace in the order given, error
+    messages by workplace for those that could not be scheduled, and a
+    validator.ValidationReport by workplace.
+    With save=True all schedules are written in one transaction after
+    every workplace has finished. Results found in the cache are not
+    recomputed (cache=False always recomputes); new ones are cached.
+    The per-workplace load, assign and validate spans of instrument are
+    only collected with jobs=1, when they run in this process.
+    """
+    if end_date is None:
+        end_date = start_date + timedelta(days=6)
+
+    workplaces = list(dict.fromkeys(workplaces))
+    jobs = min(jobs or default_jobs(), len(workplaces)) or 1
+    results = {}
+    errors = {}
+
+    with instrument.run('generate all', workplaces=len(workplaces), jobs=jobs):
+        with instrument.span('schedule'):
+            if progress:
+                progress.update(done=0, total=len(workplaces), message="Scheduling workplaces")
+
+            if jobs == 1:
+                # not worth starting processes for
+                _init_worker(db_file)
+                try:
+                    for done, workplace in enumerate(workplaces, start=1):
+                        try:
+                            results[workplace] = _schedule_one(workplace, start_date, end_date,
+                                                               cache, options)
+                        except engine.ScheduleError as e:
+                            errors[workplace] = str(e)
+                        if progress:
+                            progress.update(done=done, message=f"Scheduled {workplace}")
+                finally:
+                    _snapshot.close()
+            else:
+                # spawn rather than fork: the GUI calls this from a thread next to Tk
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                         initializer=_init_worker, initargs=(db_file,)) as pool:
+                    futures = {pool.submit(_schedule_one, workplace, start_date, end_date, cache, options):
+                               workplace for workplace in workplaces}
+                    try:
+                        for done, future in enumerate(as_completed(futures), start=1):
+                            workplace = futures[future]
+                            try:
+                                results[workplace] = future.result()
+                            except engine.ScheduleError as e:
+                                errors[workplace] = str(e)
+                            if progress:
+                                progress.update(done=done, message=f"Scheduled {workplace}")
+                    except BaseException:
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        raise
+
+        computed = [result for result in results.values() if result[3]]
+        if cache:
+            instrument.count('cache hits', len(results) - len(computed))
+            instrument.count('cache misses', len(computed))
+
+        if (save and results) or (cache and computed):
+            with instrument.span('save'):
+                if progress:
+                    progress.update(message="Saving schedules")
+                conn = db.connect(db_file)
+                try:
+                    c = conn.cursor()
+                    c.execute('BEGIN IMMEDIATE')
+                    try:
+                        if cache:
+                            for workplace_id, key, days, _, _ in computed:
+                                engine.store_range(c, workplace_id, key, days)
+                        if save:
+                            for workplace_id, key, days, _, _ in results.values():
+                                engine.write_range(c, workplace_id, days)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                finally:
+                    conn.close()
+
+    schedules = {workplace: results[workplace][2]
+                 for workplace in workplaces if workplace in results}
+    reports = {workplace: result[4] for workplace, result in results.items()}
+    return schedules, errors, reports
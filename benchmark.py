@@ -0,0 +1,356 @@
+"""Time the scheduling hot paths on synthetic data and compare runs
+
+    python -m benchmark run --scales 100 1000 10000 --output before.json
+    python -m benchmark run --scales 100000 --only generate --modes greedy balanced
+    python -m benchmark run --only startup
+    python -m benchmark compare before.json after.json
+
+Each benchmark is timed on its own, then run again under tracemalloc for
+its peak Python memory (NumPy arrays included, SQLite's own cache not).
+startup runs once per run rather than per scale: a fresh interpreter
+imports the GUI and opens its window on an empty database, and the time
+to the first drawn window is checked against STARTUP_TARGET. Results
+are JSON so runs from different versions can be compared.
+"""
+import argparse
+from datetime import datetime, timedelta
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import db
+import engine
+import synthetic
+import timeparse
+
+BENCHMARKS = ['startup', 'parse', 'import', 'generate', 'range', 'list_workers', 'validate']
+
+DEFAULT_SCALES = [100, 1000, 10000]
+DEFAULT_MODES = ['greedy', 'balanced', 'optimal']
+
+# a Sunday, so generated weeks line up with the day names
+START_DATE = datetime(2026, 1, 4)
+
+# seconds from interpreter start to the first window
+STARTUP_TARGET = 0.5
+
+# run in a fresh interpreter by measure_startup, printing its timings as JSON
+STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+result = {}
+try:
+    import tkinter as tk
+    import scheduler
+    result['import'] = time.perf_counter() - started
+    root = tk.Tk()
+    app = scheduler.SchedulerApp(root)
+    root.update()
+    result['window'] = time.perf_counter() - started
+    root.destroy()
+    app.db.close()
+except Exception as e:
+    result['error'] = f"{type(e).__name__}: {e}"
+print(json.dumps(result))
+"""
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(setup, memory=True):
+    """Run setup() -> fn, time fn(); then, if memory, run it again for its peak memory
+
+    Returns (seconds, peak KiB or None, fn's result).
+    """
+    fn = setup()
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+
+    peak = None
+    if memory:
+        fn = setup()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+
+    return seconds, peak, result
+
+
+class Suite:
+    """Synthetic data in a temporary folder, shared by the benchmarks of one scale"""
+
+    def __init__(self, folder, workers, seed):
+        self.folder = folder
+        self.workers = workers
+        self.seed = seed
+        self.db_file = os.path.join(folder, f"bench-{workers}.db")
+        self.workplace = synthetic.build_database(self.db_file, workers, seed=seed)[0]
+        self.conn = db.connect(self.db_file)
+        self.workplace_id = engine.get_workplace_id(self.conn, self.workplace)
+
+    def close(self):
+        self.conn.close()
+
+    def parse(self):
+        strings = [value for row in synthetic.roster_rows(self.workers, self.seed)
+                   for value in row[4:] if value]
+
+        def setup():
+            timeparse.clear_cache()
+
+            def run():
+                parsed = 0
+                for value in strings:
+                    try:
+                        timeparse.parse_time_range(value)
+                        parsed += 1
+                    except ValueError:
+                        pass
+                return parsed
+            return run
+        return setup
+
+    def import_(self):
+        import importer
+
+        roster = os.path.join(self.folder, f"roster-{self.workers}.xlsx")
+        if not os.path.exists(roster):
+            synthetic.write_roster(roster, self.workers, self.seed)
+
+        def setup():
+            target = os.path.join(self.folder, "import.db")
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(target + suffix):
+                    os.remove(target + suffix)
+            synthetic.build_database(target, 0, seed=self.seed)
+            conn = db.connect(target)
+            workplace_id = engine.get_workplace_id(conn, self.workplace)
+
+            def run():
+                try:
+                    return importer.import_stream(conn, workplace_id, roster).imported
+                finally:
+                    conn.close()
+            return run
+        return setup
+
+    def generate(self, mode):
+        def setup():
+            return lambda: engine.generate_range(self.conn, self.workplace, START_DATE,
+                                                 START_DATE + timedelta(days=6),
+                                                 cache=False, mode=mode)
+        return setup
+
+    def range(self, weeks=16):
+        def setup():
+            return lambda: engine.generate_range(self.conn, self.workplace, START_DATE,
+                                                 START_DATE + timedelta(days=7 * weeks - 1),
+                                                 cache=False)
+        return setup
+
+    def list_workers(self):
+        def setup():
+            return lambda: sum(1 for _ in engine.list_workers(self.conn, self.workplace_id))
+        return setup
+
+    def validate(self):
+        import validator
+
+        shifts_data, availability_data = engine.load_inputs(self.conn, self.workplace_id)
+        days = engine.assign_range(shifts_data, availability_data, START_DATE,
+                                   START_DATE + timedelta(days=6))
+        hours = validator.load_hours(self.conn, self.workplace_id)
+
+        def setup():
+            return lambda: len(validator.validate(days, availability_data, hours).problems)
+        return setup
+
+
+def measure_startup():
+    """{'import': seconds, 'window': seconds} of a cold GUI start, or with 'error'
+
+    Runs in a temporary folder so the app creates an empty database
+    there. Without a display only the import is timed.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+    with tempfile.TemporaryDirectory() as folder:
+        done = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=folder, env=env,
+                              capture_output=True, text=True, timeout=120)
+    try:
+        return json.loads(done.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return {'error': done.stderr.strip().splitlines()[-1] if done.stderr.strip() else "no output"}
+
+
+def _count(result):
+    """Items a benchmark produced, for the per-item rate"""
+    if isinstance(result, int):
+        return result
+    if isinstance(result, list):
+        return sum(len(d.assignments) for d in result)
+    return None
+
+
+def run(scales, only, modes, seed=0, memory=True, log=sys.stderr):
+    """Run the selected benchmarks at each scale and return the results document"""
+    results = []
+
+    if 'startup' in only:
+        timings = measure_startup()
+        entry = {'benchmark': 'startup', 'workers': 0, 'target': STARTUP_TARGET}
+        if 'import' in timings:
+            entry['import_seconds'] = round(timings['import'], 6)
+        if 'window' in timings:
+            entry['seconds'] = round(timings['window'], 6)
+            verdict = "within" if timings['window'] <= STARTUP_TARGET else "OVER"
+            print(f"startup: first window after {timings['window']:.3f}s "
+                  f"({verdict} the {STARTUP_TARGET}s target)", file=log)
+        else:
+            # e.g. no display: the import time is still worth keeping
+            entry['skipped'] = timings.get('error', "no window")
+            print(f"startup: skipped ({entry['skipped']})"
+                  + (f", import {timings['import']:.3f}s" if 'import' in timings else ""), file=log)
+        results.append(entry)
+        only = [name for name in only if name != 'startup']
+
+    with tempfile.TemporaryDirectory() as folder:
+        for workers in scales:
+            if not only:
+                break
+            print(f"{workers} workers: building data", file=log)
+            suite = Suite(folder, workers, seed)
+
+            cases = []
+            for name in only:
+                if name == 'generate':
+                    cases.extend((name, {'mode': mode}) for mode in modes)
+                else:
+                    cases.append((name, {}))
+
+            try:
+                for name, params in cases:
+                    entry = {'benchmark': name, 'workers': workers, **params}
+                    label = name + "".join(f" {k}={v}" for k, v in params.items())
+                    try:
+                        method = getattr(suite, 'import_' if name == 'import' else name)
+                        seconds, peak, result = measure(method(**params), memory)
+                    except ImportError as e:
+                        # e.g. pandas or openpyxl missing: record it rather than fail the run
+                        entry['skipped'] = str(e)
+                        print(f"  {label}: skipped ({e})", file=log)
+                        results.append(entry)
+                        continue
+
+                    entry.update(seconds=round(seconds, 6), peak_kib=peak, items=_count(result))
+                    results.append(entry)
+                    print(f"  {label}: {seconds:.3f}s"
+                          + (f", peak {peak} KiB" if peak is not None else ""), file=log)
+            finally:
+                suite.close()
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'memory': memory,
+            'date': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+
+def compare(before, after):
+    """Rows of (benchmark label, workers, seconds before, after, ratio) for results in both"""
+    def key(entry):
+        params = {k: v for k, v in entry.items()
+                  if k not in ('benchmark', 'workers', 'seconds', 'peak_kib', 'items', 'skipped',
+                               'target', 'import_seconds')}
+        label = entry['benchmark'] + "".join(f" {k}={v}" for k, v in sorted(params.items()))
+        return label, entry['workers']
+
+    old = {key(e): e for e in before['results'] if 'seconds' in e}
+    rows = []
+    for entry in after['results']:
+        if 'seconds' not in entry or key(entry) not in old:
+            continue
+        was = old[key(entry)]['seconds']
+        rows.append(key(entry) + (was, entry['seconds'], entry['seconds'] / was if was else None))
+    return rows
+
+
+def cmd_run(args):
+    document = run(args.scales, args.only, args.modes, args.seed, memory=not args.no_memory)
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+def cmd_compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{'benchmark':<32}{'workers':>9}{'before':>11}{'after':>11}{'ratio':>8}")
+    for label, workers, was, now, ratio in compare(before, after):
+        ratio_text = f"{ratio:.2f}" if ratio is not None else "-"
+        print(f"{label:<32}{workers:>9}{was:>10.3f}s{now:>10.3f}s{ratio_text:>8}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmark",
+                                     description="Benchmark the scheduling hot paths")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help="run benchmarks and write JSON results")
+    run_parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                            help="worker counts to run at (default: 100 1000 10000)")
+    run_parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=BENCHMARKS,
+                            help="benchmarks to run (default: all)")
+    run_parser.add_argument('--modes', nargs='+', choices=engine.MODES, default=DEFAULT_MODES,
+                            help="scheduling modes for the generate benchmark")
+    run_parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    run_parser.add_argument('--no-memory', action='store_true',
+                            help="skip the second run that measures peak memory")
+    run_parser.add_argument('--output', help="write results here instead of stdout")
+    run_parser.set_defaults(func=cmd_run)
+
+    cmp_parser = sub.add_parser('compare', help="compare two result files")
+    cmp_parser.add_argument('before', help="results of the old version")
+    cmp_parser.add_argument('after', help="results of the new version")
+    cmp_parser.set_defaults(func=cmd_compare)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+"""Command line entry point for generating schedules without the GUI
+
+Usage:
+    python -m cli list
+    python -m cli generate --workplace Library --start-date 2026-01-11 --save
+    python -m cli generate --all --export-dir exports
+    python -m cli generate --all --jobs 8 --save
+    python -m cli generate --all --start-date 2026-01-11 --end-date 2026-05-02 --save
+    python -m cli reschedule --workplace Library --start-date 2026-01-11
+    python -m cli validate --workplace Library --start-date 2026-01-11
+    python -m cli exception --workplace Library --date 2026-03-16 --close
+    python -m cli exception --workplace Library --date 2026-03-20 --start "06:00 PM" --end "10:00 PM"
+    python -m cli import roster.xlsx --workplace Library
+    python -m cli coverage --workplace Library --slot-minutes 30
+    python -m cli export semester.xlsx --all --start-date 2026-01-11 --end-date 2026-05-02
+    python -m cli export payroll.csv --all --start-date 2026-01-11 --end-date 2026-01-24
+    python -m cli export calendars --workplace Library --end-date 2026-05-02
+    python -m cli --timings --metrics-log runs.jsonl generate --workplace Library
+    python -m cli --profile generate.prof generate --all
+"""
+import argparse
+import sys
+import os
+from datetime import datetime
+
+import batch
+import db
+import engine
+import exporter
+import instrument
+import migrations
+from timeparse import time_to_minutes
+import validator
+
+
+def cmd_list(args):
+    """Print every workplace in the database"""
+    conn = db.connect(args.db)
+    for name in engine.list_workplaces(conn):
+        print(name)
+    conn.close()
+    return 0
+
+
+def cmd_generate(args):
+    """Generate (and optionally save/export) schedules for one or many workplaces"""
+    try:
+        start_date = datetime.strptime(args.start_date, "%Y-%m-%d")
+        end_date = datetime.strptime(args.end_date, "%Y-%m-%d") if args.end_date else None
+    except ValueError:
+        print("Invalid date format. Use YYYY-MM-DD", file=sys.stderr)
+        return 2
+
+    if end_date and end_date < start_date:
+        print("--end-date is before --start-date", file=sys.stderr)
+        return 2
+
+    conn = db.connect(args.db)
+    workplaces = engine.list_workplaces(conn) if args.all else args.workplace
+    conn.close()
+
+    if not workplaces:
+        print("No workplaces selected. Use --workplace NAME or --all", file=sys.stderr)
+        return 2
+
+    if args.export_dir and not os.path.exists(args.export_dir):
+        os.makedirs(args.export_dir)
+
+    schedules, errors, reports = batch.generate_many(args.db, workplaces, start_date, end_date,
+                                                     save=args.save, cache=not args.no_cache,
+                                                     jobs=args.jobs, mode=args.mode,
+                                                     max_shifts=args.max_shifts,
+                                                     max_hours=args.max_hours,
+                                                     slot_minutes=args.slot_minutes)
+
+    for workplace in workplaces:
+        if workplace in errors:
+            print(f"{workplace}: {errors[workplace]}", file=sys.stderr)
+            continue
+
+        days = schedules[workplace]
+        shifts = sum(len(d.shifts) for d in days)
+        filled = sum(len(d.assignments) for d in days)
+        print(f"{workplace}: {len(days)} days, {shifts} shifts, {filled} assignments")
+
+        report = reports[workplace]
+        if not report.ok:
+            print(report.summary(limit=args.show_problems), file=sys.stderr)
+
+        if args.export_dir:
+            # one workbook per workplace with a sheet per week
+            exporter.export(os.path.join(args.export_dir, f"{workplace}.xlsx"), {workplace: days})
+
+    return 1 if errors else 0
+
+
+def cmd_reschedule(args):
+    """Update a saved schedule to the current inputs and print what changed"""
+    import incremental
+
+    try:
+        start_date = datetime.strptime(args.start_date, "%Y-%m-%d")
+        end_date = datetime.strptime(args.end_date, "%Y-%m-%d") if args.end_date else None
+    except ValueError:
+        print("Invalid date format. Use YYYY-MM-DD", file=sys.stderr)
+        return 2
+
+    conn = db.connect(args.db)
+    try:
+        result = incremental.reschedule(conn, args.workplace, start_date, end_date,
+                                        save=not args.dry_run, max_shifts=args.max_shifts,
+                                        mode=args.mode, max_hours=args.max_hours)
+    except engine.ScheduleError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    for change in result.removed:
+        print(f"- {incremental.describe(change)}")
+    for change in result.added:
+        print(f"+ {incremental.describe(change)}")
+    print(f"{len(result.removed)} removed, {len(result.added)} added")
+    return 0
+
+
+def cmd_exception(args):
+    """Close a workplace on a date, add a one-off shift, or clear a date's exceptions"""
+    try:
+        date = datetime.strptime(args.date, "%Y-%m-%d")
+        start = time_to_minutes(args.start) if args.start else None
+        end = time_to_minutes(args.end, end=True) if args.end else None
+    except ValueError:
+        print("Use YYYY-MM-DD for --date and HH:MM AM/PM for --start/--end", file=sys.stderr)
+        return 2
+
+    if (start is None) != (end is None) or (not args.close and not args.clear and start is None):
+        print("Give both --start and --end (a one-off shift always needs them)", file=sys.stderr)
+        return 2
+
+    conn = db.connect(args.db)
+    try:
+        workplace_id = engine.get_workplace_id(conn, args.workplace)
+        c = conn.cursor()
+        if args.clear:
+            engine.clear_exceptions(c, workplace_id, date)
+        else:
+            engine.add_exception(c, workplace_id, date, args.close, start, end, args.positions)
+        conn.commit()
+    except engine.ScheduleError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    return 0
+
+
+def cmd_import(args):
+    """Import a roster workbook into a workplace"""
+    import importer
+    import timeparse
+
+    conn = db.connect(args.db)
+    try:
+        workplace_id = engine.get_workplace_id(conn, args.workplace)
+        if args.in_memory:
+            report = importer.import_excel(conn, workplace_id, args.file)
+        else:
+            report = importer.import_stream(conn, workplace_id, args.file, args.batch_size)
+    except (engine.ScheduleError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    print(report.summary(limit=args.show_errors))
+
+    cache = timeparse.cache_info()
+    print(f"Time parser cache: {cache['hits']} hits, {cache['misses']} misses")
+
+    # new availability can break a schedule that was already saved
+    conn = db.connect(args.db)
+    try:
+        validation = validator.check_saved(conn, args.workplace, datetime.now())
+    except engine.ScheduleError:
+        validation = validator.ValidationReport()
+    finally:
+        conn.close()
+
+    if not validation.ok:
+        print("Saved schedule for the coming week:", file=sys.stderr)
+        print(validation.summary(limit=args.show_errors), file=sys.stderr)
+    return 0
+
+
+def cmd_validate(args):
+    """Check a saved schedule for conflicts and print what is wrong"""
+    try:
+        start_date = datetime.strptime(args.start_date, "%Y-%m-%d")
+        end_date = datetime.strptime(args.end_date, "%Y-%m-%d") if args.end_date else None
+    except ValueError:
+        print("Invalid date format. Use YYYY-MM-DD", file=sys.stderr)
+        return 2
+
+    conn = db.connect(args.db)
+    try:
+        report = validator.check_saved(conn, args.workplace, start_date, end_date)
+    except engine.ScheduleError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    print(report.summary(limit=args.show_problems))
+    return 0 if report.ok else 1
+
+
+def cmd_export(args):
+    """Write saved schedules of one or many workplaces to a file or calendar folder"""
+    try:
+        start_date = datetime.strptime(args.start_date, "%Y-%m-%d")
+        end_date = datetime.strptime(args.end_date, "%Y-%m-%d") if args.end_date else None
+    except ValueError:
+        print("Invalid date format. Use YYYY-MM-DD", file=sys.stderr)
+        return 2
+
+    conn = db.connect(args.db)
+    try:
+        workplaces = engine.list_workplaces(conn) if args.all else args.workplace
+        if not workplaces:
+            print("No workplaces selected. Use --workplace NAME or --all", file=sys.stderr)
+            return 2
+
+        format = exporter.format_of(args.file, args.format)
+        written = exporter.export(args.file, exporter.saved_schedules(conn, workplaces,
+                                                                     start_date, end_date),
+                                 by=args.by, format=format)
+    except (engine.ScheduleError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    if not written and format != 'ics':
+        print("Nothing saved in that range", file=sys.stderr)
+        return 1
+    print(f"Wrote {written} {exporter.UNITS[format]} to {args.file}")
+    return 0
+
+
+def cmd_coverage(args):
+    """Print the number of available workers per slot and day"""
+    conn = db.connect(args.db)
+    try:
+        matrix, headcount = engine.coverage(conn, args.workplace, args.slot_minutes)
+    except engine.ScheduleError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    print("\t".join(["Time"] + [day[:3] for day in engine.DAYS]))
+    for slot in range(matrix.slots):
+        counts = headcount[:, slot]
+        if counts.any():
+            label = engine.minutes_to_time(slot * matrix.slot_minutes)
+            print("\t".join([label] + [str(n) for n in counts]))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli",
+                                     description="Work schedule generator (headless)")
+    parser.add_argument('--db', default='data/schedule.db',
+                        help="path to the schedule database (default: data/schedule.db)")
+    parser.add_argument('--timings', action='store_true',
+                        help="print where the time went (phases and counters) to stderr")
+    parser.add_argument('--metrics-log',
+                        help="append the timings of the run to this file as a JSON line")
+    parser.add_argument('--profile',
+                        help="write a cProfile dump of the command to this file")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = sub.add_parser('list', help="list workplaces")
+    list_parser.set_defaults(func=cmd_list)
+
+    gen_parser = sub.add_parser('generate', help="generate schedules")
+    gen_parser.add_argument('--workplace', action='append', default=[],
+                            help="workplace name (repeat for several)")
+    gen_parser.add_argument('--all', action='store_true', help="generate every workplace")
+    gen_parser.add_argument('--start-date', default=datetime.now().strftime("%Y-%m-%d"),
+                            help="first day of the week (YYYY-MM-DD, default: today)")
+    gen_parser.add_argument('--end-date',
+                            help="last day to schedule (YYYY-MM-DD, default: one week)")
+    gen_parser.add_argument('--mode', choices=engine.MODES, default='greedy',
+                            help="greedy (fast, default), optimal (fills more without double-booking, "
+                                 "via min-cost flow) or balanced (spread hours evenly)")
+    gen_parser.add_argument('--max-shifts', type=int,
+                            help="most shifts one worker gets per week (optimal and balanced modes)")
+    gen_parser.add_argument('--max-hours', type=int,
+                            help="weekly hour cap for workers without their own (balanced mode)")
+    gen_parser.add_argument('--slot-minutes', type=int, default=15,
+                            help="slot size for the vectorized mode (5, 15, 30, ...)")
+    gen_parser.add_argument('--save', action='store_true',
+                            help="store the assignments in the schedules table")
+    gen_parser.add_argument('--show-problems', type=int, default=5,
+                            help="how many validation problems of each kind to list (default: 5)")
+    gen_parser.add_argument('--no-cache', action='store_true',
+                            help="recompute even if the inputs have not changed since the last run")
+    gen_parser.add_argument('--jobs', type=int,
+                            help="workplaces scheduled in parallel (default: one per CPU)")
+    gen_parser.add_argument('--export-dir',
+                            help="write one Excel file per workplace (a sheet per week) into this folder")
+    gen_parser.set_defaults(func=cmd_generate)
+
+    resched_parser = sub.add_parser('reschedule',
+                                    help="update a saved schedule after shifts or availability changed")
+    resched_parser.add_argument('--workplace', required=True, help="workplace name")
+    resched_parser.add_argument('--start-date', default=datetime.now().strftime("%Y-%m-%d"),
+                                help="first day of the saved schedule (YYYY-MM-DD, default: today)")
+    resched_parser.add_argument('--end-date',
+                                help="last day to update (YYYY-MM-DD, default: one week)")
+    resched_parser.add_argument('--mode', choices=engine.MODES, default='greedy',
+                                help="mode the saved schedule was generated with; open positions "
+                                     "are filled by its rules (default: greedy)")
+    resched_parser.add_argument('--max-shifts', type=int,
+                                help="most shifts one worker gets per week")
+    resched_parser.add_argument('--max-hours', type=int,
+                                help="weekly hour cap for workers without their own (balanced mode)")
+    resched_parser.add_argument('--dry-run', action='store_true',
+                                help="print the changes without saving them")
+    resched_parser.set_defaults(func=cmd_reschedule)
+
+    val_parser = sub.add_parser('validate', help="check a saved schedule for conflicts")
+    val_parser.add_argument('--workplace', required=True, help="workplace name")
+    val_parser.add_argument('--start-date', default=datetime.now().strftime("%Y-%m-%d"),
+                            help="first day to check (YYYY-MM-DD, default: today)")
+    val_parser.add_argument('--end-date',
+                            help="last day to check (YYYY-MM-DD, default: one week)")
+    val_parser.add_argument('--show-problems', type=int, default=20,
+                            help="how many problems of each kind to list (default: 20)")
+    val_parser.set_defaults(func=cmd_validate)
+
+    exc_parser = sub.add_parser('exception', help="close a date or add a one-off shift")
+    exc_parser.add_argument('--workplace', required=True, help="workplace name")
+    exc_parser.add_argument('--date', required=True, help="the date (YYYY-MM-DD)")
+    exc_action = exc_parser.add_mutually_exclusive_group()
+    exc_action.add_argument('--close', action='store_true',
+                            help="close the workplace (all day, or between --start and --end)")
+    exc_action.add_argument('--clear', action='store_true',
+                            help="remove every exception on the date")
+    exc_parser.add_argument('--start', help="start time (HH:MM AM/PM)")
+    exc_parser.add_argument('--end', help="end time (HH:MM AM/PM)")
+    exc_parser.add_argument('--positions', type=int, default=1,
+                            help="positions of a one-off shift (default: 1)")
+    exc_parser.set_defaults(func=cmd_exception)
+
+    import_parser = sub.add_parser('import', help="import workers from an Excel roster")
+    import_parser.add_argument('file', help="roster workbook (.xlsx) or .csv")
+    import_parser.add_argument('--workplace', required=True, help="workplace name")
+    import_parser.add_argument('--show-errors', type=int, default=20,
+                               help="how many rejected rows to list (default: 20)")
+    import_parser.add_argument('--batch-size', type=int, default=5000,
+                               help="rows written per batch when streaming (default: 5000)")
+    import_parser.add_argument('--in-memory', action='store_true',
+                               help="load the first sheet with pandas instead of streaming")
+    import_parser.set_defaults(func=cmd_import)
+
+    export_parser = sub.add_parser('export', help="write saved schedules to Excel, CSV, JSON Lines "
+                                                  "or calendar feeds")
+    export_parser.add_argument('file', help="file to write (.xlsx, .csv, .jsonl) or a folder "
+                                            "for one .ics feed per worker")
+    export_parser.add_argument('--format', choices=exporter.FORMATS,
+                               help="format, if not the file's extension")
+    export_parser.add_argument('--workplace', action='append', default=[],
+                               help="workplace name (repeat for several)")
+    export_parser.add_argument('--all', action='store_true', help="export every workplace")
+    export_parser.add_argument('--start-date', default=datetime.now().strftime("%Y-%m-%d"),
+                               help="first day to export (YYYY-MM-DD, default: today)")
+    export_parser.add_argument('--end-date',
+                               help="last day to export (YYYY-MM-DD, default: one week)")
+    export_parser.add_argument('--by', choices=exporter.SHEET_LAYOUTS, default=exporter.BY_WEEK,
+                               help="a sheet per workplace and week (default) or per workplace")
+    export_parser.set_defaults(func=cmd_export)
+
+    cov_parser = sub.add_parser('coverage', help="show how many workers are free in each time slot")
+    cov_parser.add_argument('--workplace', required=True, help="workplace name")
+    cov_parser.add_argument('--slot-minutes', type=int, default=30,
+                            help="slot size in minutes (default: 30)")
+    cov_parser.set_defaults(func=cmd_coverage)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    migrations.migrate(args.db)
+
+    instrument.configure(args.metrics_log, args.profile)
+    with instrument.run(args.command) as run:
+        status = args.func(args)
+
+    if args.timings:
+        print(run.summary(), file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Long-lived, tuned SQLite connections shared by the GUI, CLI and workers"""
+from contextlib import contextmanager
+import sqlite3
+import threading
+
+# prepared statements kept per connection
+STATEMENT_CACHE = 256
+
+# page cache per connection in KiB (negative cache_size means KiB to SQLite)
+CACHE_KIB = 64 * 1024
+
+# how long to wait for another connection's write lock, in milliseconds
+BUSY_TIMEOUT = 5000
+
+
+def connect(db_file, check_same_thread=True):
+    """Open a connection with the settings every part of the app should use
+
+    WAL lets readers (e.g. a background generation) run while the GUI
+    writes, synchronous=NORMAL skips the fsync on every commit that WAL
+    makes unnecessary, and foreign keys are enforced.
+    """
+    conn = sqlite3.connect(db_file,
+                           cached_statements=STATEMENT_CACHE,
+                           check_same_thread=check_same_thread)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA cache_size = {-CACHE_KIB}')
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT}')
+    return conn
+
+
+class Database:
+    """One open connection per thread, created on first use and reused after
+
+    SQLite connections must not be shared between threads, so a worker
+    thread gets its own connection (the "pool" is one per thread) while
+    the Tk thread keeps reusing its own for the life of the app.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        """The calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_file)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def cursor(self):
+        return self.connection().cursor()
+
+    @contextmanager
+    def transaction(self):
+        """Yield a cursor and commit at the end, or roll back on error"""
+        conn = self.connection()
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def release(self):
+        """Close the calling thread's connection (call at the end of a worker thread)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._connections.remove(conn)
+            conn.close()
+
+    def close(self):
+        """Close every connection, e.g. when the app exits"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # connections of finished threads cannot be closed from here
+                pass
+        self._local = threading.local()
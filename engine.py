@@ -0,0 +1,505 @@
+"""Headless scheduling engine shared by the GUI and the command line"""
+from collections import namedtuple
+from itertools import groupby
+from datetime import timedelta
+import hashlib
+import json
+
+import instrument
+from timeparse import minutes_to_time
+import solver
+
+MODES = ['greedy', 'optimal', 'vectorized', 'balanced']
+
+# the assign_shifts options each mode reads; the others cannot change its result
+MODE_OPTIONS = {
+    'greedy': (),
+    'optimal': ('max_shifts',),
+    'vectorized': ('slot_minutes',),
+    'balanced': ('max_shifts', 'max_hours', 'limits'),
+}
+
+SLOT_MINUTES = 15
+
+DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+# one worker placed on one shift
+Assignment = namedtuple('Assignment', ['day', 'start_time', 'end_time', 'worker_id', 'name'])
+
+# one calendar date of a generated range: its shifts as (start, end, positions) and assignments
+DaySchedule = namedtuple('DaySchedule', ['date', 'day', 'shifts', 'assignments'])
+
+
+# cached results kept per workplace, newest first
+CACHE_ENTRIES = 16
+
+
+class ScheduleError(Exception):
+    """Raised when a workplace cannot be scheduled"""
+
+
+def get_workplace_id(conn, name):
+    """Look up a workplace ID by name"""
+    c = conn.cursor()
+    c.execute('SELECT id FROM workplaces WHERE name = ?', (name,))
+    row = c.fetchone()
+
+    if not row:
+        raise ScheduleError(f"Workplace '{name}' not found")
+
+    return row[0]
+
+
+def list_workplaces(conn):
+    """Return the names of every workplace"""
+    c = conn.cursor()
+    c.execute('SELECT name FROM workplaces ORDER BY name')
+    return [row[0] for row in c.fetchall()]
+
+
+def list_workers(conn, workplace_id):
+    """Yield (id, name, email, work study, availability text) for each worker
+
+    One sorted scan over workers LEFT JOIN availability, grouped here,
+    instead of a query per worker.
+    """
+    c = conn.cursor()
+    c.execute('''SELECT w.id, w.first_name, w.last_name, w.email, w.work_study,
+                       a.day, a.start_time, a.end_time
+                FROM workers w
+                LEFT JOIN availability a ON w.id = a.worker_id
+                WHERE w.workplace_id = ?
+                ORDER BY w.id, CASE a.day
+                    WHEN 'Sunday' THEN 1
+                    WHEN 'Monday' THEN 2
+                    WHEN 'Tuesday' THEN 3
+                    WHEN 'Wednesday' THEN 4
+                    WHEN 'Thursday' THEN 5
+                    WHEN 'Friday' THEN 6
+                    WHEN 'Saturday' THEN 7
+                END, a.start_minute''', (workplace_id,))
+
+    for worker_id, rows in groupby(c, key=lambda row: row[0]):
+        rows = list(rows)
+        worker_id, first_name, last_name, email, work_study = rows[0][:5]
+
+        # format availability for display
+        avail_str = ", ".join(f"{day}: {start}-{end}" for *_, day, start, end in rows if day)
+
+        yield worker_id, f"{first_name} {last_name}", email, bool(work_study), avail_str
+
+
+def load_inputs(conn, workplace_id):
+    """Fetch the shifts and worker availability rows for a workplace"""
+    c = conn.cursor()
+
+    # get shifts for this workplace
+    c.execute('''SELECT day, start_minute, end_minute, positions
+                FROM shifts
+                WHERE workplace_id = ? AND start_minute IS NOT NULL''', (workplace_id,))
+
+    shifts_data = c.fetchall()
+
+    if not shifts_data:
+        raise ScheduleError("No shifts defined for this workplace. Please add shifts in the Workplace Hours tab.")
+
+    # get workers and their availability
+    c.execute('''SELECT w.id, w.first_name, w.last_name, w.work_study,
+                       a.day, a.start_minute, a.end_minute
+                FROM workers w
+                JOIN availability a ON w.id = a.worker_id
+                WHERE w.workplace_id = ? AND a.start_minute IS NOT NULL''', (workplace_id,))
+
+    availability_data = c.fetchall()
+
+    if not availability_data:
+        raise ScheduleError("No workers with availability found")
+
+    return shifts_data, availability_data
+
+
+def load_limits(conn, workplace_id):
+    """{worker id: (preferred_shifts, max_hours)} for the balanced mode"""
+    c = conn.cursor()
+    c.execute('''SELECT id, preferred_shifts, max_hours
+                FROM workers
+                WHERE workplace_id = ?
+                ORDER BY id''', (workplace_id,))
+    return {worker_id: (preferred or 0, max_hours) for worker_id, preferred, max_hours in c.fetchall()}
+
+
+def load_exceptions(conn, workplace_id, first_date, last_date):
+    """Closures and one-off shifts between two dates (inclusive)
+
+    Returns {date string: (closures, extra shifts)} where closures are
+    (start, end) windows and extra shifts are (start, end, positions).
+    A closure without times closes the whole day.
+    """
+    c = conn.cursor()
+    c.execute('''SELECT date, closed, start_minute, end_minute, positions
+                FROM shift_exceptions
+                WHERE workplace_id = ? AND date BETWEEN ? AND ?
+                ORDER BY id''', (workplace_id, first_date.strftime("%Y-%m-%d"),
+                                 last_date.strftime("%Y-%m-%d")))
+
+    exceptions = {}
+    for date, closed, start, end, positions in c.fetchall():
+        closures, extra = exceptions.setdefault(date, ([], []))
+        if closed:
+            closures.append((0, 24 * 60) if start is None else (start, end))
+        elif start is not None:
+            extra.append((start, end, positions or 1))
+
+    return exceptions
+
+
+def add_exception(c, workplace_id, date, closed, start=None, end=None, positions=1):
+    """Record a closure or one-off shift on a date inside the caller's transaction"""
+    c.execute('''INSERT INTO shift_exceptions
+                (workplace_id, date, closed, start_minute, end_minute, positions)
+                VALUES (?, ?, ?, ?, ?, ?)''',
+              (workplace_id, date.strftime("%Y-%m-%d"), closed, start, end, positions))
+
+
+def clear_exceptions(c, workplace_id, date):
+    """Remove every closure and one-off shift on a date"""
+    c.execute('DELETE FROM shift_exceptions WHERE workplace_id = ? AND date = ?',
+              (workplace_id, date.strftime("%Y-%m-%d")))
+
+
+def assign_shifts(shifts_data, availability_data, mode='greedy', max_shifts=None, slot_minutes=SLOT_MINUTES,
+                  max_hours=None, limits=None, check=None):
+    """Assign available workers to each shift, work study students first
+
+    Shift and availability times are minutes since midnight. The greedy
+    mode fills each shift on its own; 'optimal' solves the whole week as
+    a flow problem (see solver.py), never double-books a worker and
+    honours max_shifts per worker; 'vectorized' is greedy with
+    eligibility computed on a NumPy bitmap of slot_minutes slots;
+    'balanced' gives each position to the least loaded worker (see
+    balancer.py), honouring max_shifts, max_hours and the per-worker
+    limits of load_limits.
+
+    check (e.g. Progress.check) is called while shifts are filled and
+    while the optimal and balanced solvers run, so a run can be cancelled
+    part way; assign_range reports the progress itself.
+    """
+    instrument.count('shifts solved', len(shifts_data))
+
+    if mode == 'optimal':
+        picks = solver.assign_optimal(shifts_data, availability_data, max_shifts, check)
+    elif mode == 'vectorized':
+        import availability_matrix
+        picks = availability_matrix.assign_greedy(shifts_data, availability_data, slot_minutes)
+    elif mode == 'balanced':
+        import balancer
+        picks = balancer.assign_balanced(shifts_data, availability_data, limits, max_shifts, max_hours,
+                                         check)
+    elif mode != 'greedy':
+        raise ValueError(f"Unknown scheduling mode: {mode}")
+
+    if mode != 'greedy':
+        return [Assignment(shifts_data[i][0], shifts_data[i][1], shifts_data[i][2], worker_id, name)
+                for i, worker_id, name in picks]
+
+    # rank each day's windows once, work study students first: a shift then takes the
+    # first windows that cover it instead of sorting all of its candidates
+    windows_by_day = {}
+    for worker_id, fname, lname, work_study, day, start, end in availability_data:
+        windows_by_day.setdefault(day, []).append((start, end, worker_id, f"{fname} {lname}", work_study))
+
+    ranked_by_day = {}
+    for day, windows in windows_by_day.items():
+        # stable sorts, so equal ranks stay in start order
+        windows.sort(key=lambda w: w[0])
+        windows.sort(key=lambda w: (w[4], w[3]), reverse=True)
+        ranked_by_day[day] = windows
+
+    assignments = []
+    candidates = 0
+
+    for i, (day, shift_start, shift_end, positions) in enumerate(shifts_data):
+        if check:
+            check()
+
+        if day not in ranked_by_day or positions <= 0:
+            continue
+
+        # the best ranked workers whose availability covers the whole shift; a worker
+        # with two covering windows takes one position only
+        used = set()
+        for start, end, worker_id, name, work_study in ranked_by_day[day]:
+            candidates += 1
+            if start <= shift_start and end >= shift_end and worker_id not in used:
+                assignments.append(Assignment(day, shift_start, shift_end, worker_id, name))
+                used.add(worker_id)
+                if len(used) == positions:
+                    break
+
+    instrument.count('candidates', candidates)
+
+    return assignments
+
+
+def day_name(date):
+    return DAYS[(date.weekday() + 1) % 7]
+
+
+def shifts_on(weekly, day, exceptions):
+    """The (start, end, positions) shifts of one date after its exceptions"""
+    closures, extra = exceptions
+    shifts = [shift for shift in weekly.get(day, ())
+              if not any(shift[0] < close_end and close_start < shift[1]
+                         for close_start, close_end in closures)]
+    return tuple(shifts + extra)
+
+
+def _solve_days(inputs, availability_data, options):
+    """Assign several days' shifts with one assign_shifts call, split by day"""
+    shifts_data = [(day, start, end, positions)
+                   for day, shifts in inputs for start, end, positions in shifts]
+    by_day = {day: [] for day, shifts in inputs}
+    if shifts_data:
+        for a in assign_shifts(shifts_data, availability_data, **options):
+            by_day[a.day].append(a)
+    return by_day
+
+
+def assign_range(shifts_data, availability_data, start_date, end_date, exceptions=None,
+                 progress=None, **options):
+    """Assign every date from start_date to end_date (inclusive)
+
+    The weekly shifts in shifts_data repeat on each date, changed by the
+    exceptions of load_exceptions. Results are reused instead of
+    recomputed: every day of a week identical to one already done is
+    copied, and a week with exceptions only solves the days they change.
+    Balanced mode and optimal mode with max_shifts couple the days of a
+    week, so there whole weeks are the unit of reuse. Returns a
+    DaySchedule per date.
+
+    progress is told which week is being solved, and cancelling it
+    stops the run between weeks or inside a long optimal or balanced
+    solve.
+    """
+    exceptions = exceptions or {}
+    if progress:
+        options = dict(options, check=progress.check)
+    no_exceptions = ([], [])
+
+    weekly = {}
+    for day, start, end, positions in shifts_data:
+        weekly.setdefault(day, []).append((start, end, positions))
+
+    whole_weeks = (options.get('mode') == 'balanced'
+                   or (options.get('mode') == 'optimal' and options.get('max_shifts')))
+    solved = {}
+
+    dates = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+    weeks = [dates[i:i + 7] for i in range(0, len(dates), 7)]
+
+    days = []
+    for n, week in enumerate(weeks):
+        if progress:
+            progress.update(done=n, total=len(weeks), message=f"Week of {week[0]:%Y-%m-%d}")
+
+        inputs = [(day_name(date), shifts_on(weekly, day_name(date),
+                                              exceptions.get(date.strftime("%Y-%m-%d"), no_exceptions)))
+                  for date in week]
+
+        if whole_weeks:
+            key = tuple(inputs)
+            if key in solved:
+                instrument.count('days reused', len(inputs))
+            else:
+                solved[key] = _solve_days(inputs, availability_data, options)
+            by_day = solved[key]
+        else:
+            # each (day, shifts) pair is solved once for the whole range
+            missing = [(day, shifts) for day, shifts in inputs if (day, shifts) not in solved]
+            instrument.count('days reused', len(inputs) - len(missing))
+            if missing:
+                shifts_by_day = dict(missing)
+                for day, assignments in _solve_days(missing, availability_data, options).items():
+                    solved[(day, shifts_by_day[day])] = assignments
+            by_day = {day: solved[(day, shifts)] for day, shifts in inputs}
+
+        for date, (day, shifts) in zip(week, inputs):
+            days.append(DaySchedule(date.strftime("%Y-%m-%d"), day, shifts, by_day[day]))
+
+    if progress:
+        progress.update(done=len(weeks), total=len(weeks))
+
+    return days
+
+
+def shift_key(start, end):
+    """Row label for a shift, e.g. '09:00 AM - 01:00 PM'"""
+    return f"{minutes_to_time(start)} - {minutes_to_time(end)}"
+
+
+def build_grid(shifts_data, assignments):
+    """Arrange assignments into {shift key: {day: [names]}}, ordered by start time"""
+    schedule = {}
+
+    # every shift gets a row, even when nobody could be assigned
+    for start, end in sorted({(start, end) for day, start, end, positions in shifts_data}):
+        schedule[shift_key(start, end)] = {d: [] for d in DAYS}
+
+    for a in assignments:
+        schedule[shift_key(a.start_time, a.end_time)][a.day].append(a.name)
+
+    return schedule
+
+
+def week_grid(days):
+    """build_grid for up to seven consecutive DaySchedules"""
+    shifts_data = [(d.day, start, end, positions) for d in days for start, end, positions in d.shifts]
+    return build_grid(shifts_data, [a for d in days for a in d.assignments])
+
+
+def schedule_rows(schedule):
+    """Flatten a schedule into one row per shift (time followed by each day)"""
+    rows = []
+    for shift, days in schedule.items():
+        row_data = [shift]
+        for day in DAYS:
+            row_data.append('\n'.join(days[day]))
+        rows.append(tuple(row_data))
+    return rows
+
+
+def write_range(c, workplace_id, days):
+    """Replace the dates covered by a list of DaySchedules inside the caller's transaction"""
+    _replace_schedules(c, workplace_id, days[0].date, days[-1].date,
+                       [(d.date, a) for d in days for a in d.assignments])
+
+
+def _replace_schedules(c, workplace_id, first_date, last_date, dated):
+    c.execute('DELETE FROM schedules WHERE workplace_id = ? AND date BETWEEN ? AND ?',
+              (workplace_id, first_date, last_date))
+
+    c.executemany('''INSERT INTO schedules
+                    (workplace_id, worker_id, date, start_time, end_time)
+                    VALUES (?, ?, ?, ?, ?)''',
+                  [(workplace_id, a.worker_id, date,
+                    minutes_to_time(a.start_time), minutes_to_time(a.end_time))
+                   for date, a in dated])
+
+
+def coverage(conn, workplace, slot_minutes=15):
+    """Per-slot headcount of available workers as (matrix, headcount by day and slot)"""
+    import availability_matrix
+
+    workplace_id = get_workplace_id(conn, workplace)
+    c = conn.cursor()
+    c.execute('''SELECT w.id, w.first_name, w.last_name, w.work_study,
+                       a.day, a.start_minute, a.end_minute
+                FROM workers w
+                JOIN availability a ON w.id = a.worker_id
+                WHERE w.workplace_id = ? AND a.start_minute IS NOT NULL''', (workplace_id,))
+
+    matrix = availability_matrix.AvailabilityMatrix(c.fetchall(), slot_minutes)
+    return matrix, matrix.headcount()
+
+
+def fingerprint(shifts_data, availability_data, exceptions, start_date, end_date, options):
+    """Hash of everything a generated range depends on
+
+    Any changed shift, availability row, worker name or work study flag,
+    exception or option gives a different key, so stale cache entries
+    are never looked up again. Options the mode does not read and unset
+    (None) ones are left out, so the CLI's explicit defaults and the
+    GUI's bare mode share a key.
+    """
+    mode = options.get('mode', 'greedy')
+    used = {'mode': mode}
+    if mode == 'vectorized':
+        used['slot_minutes'] = SLOT_MINUTES
+    for name in MODE_OPTIONS.get(mode, ()):
+        if options.get(name) is not None:
+            used[name] = options[name]
+
+    digest = hashlib.sha256()
+    for part in (sorted(shifts_data), sorted(availability_data), sorted(exceptions.items()),
+                 start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"),
+                 sorted(used.items())):
+        digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+def cached_range(conn, workplace_id, key):
+    """The DaySchedules stored under a fingerprint, or None"""
+    c = conn.cursor()
+    c.execute('SELECT result FROM schedule_cache WHERE workplace_id = ? AND fingerprint = ?',
+              (workplace_id, key))
+    row = c.fetchone()
+
+    if not row:
+        return None
+
+    return [DaySchedule(date, day, tuple(tuple(shift) for shift in shifts),
+                        [Assignment(day, start, end, worker_id, name)
+                         for start, end, worker_id, name in assignments])
+            for date, day, shifts, assignments in json.loads(row[0])]
+
+
+def store_range(c, workplace_id, key, days):
+    """Cache DaySchedules under a fingerprint inside the caller's transaction"""
+    result = json.dumps([[d.date, d.day, d.shifts,
+                          [[a.start_time, a.end_time, a.worker_id, a.name] for a in d.assignments]]
+                         for d in days])
+
+    c.execute('''INSERT OR REPLACE INTO schedule_cache (workplace_id, fingerprint, result)
+                VALUES (?, ?, ?)''', (workplace_id, key, result))
+
+    # keep only the newest entries of this workplace
+    c.execute('''DELETE FROM schedule_cache
+                WHERE workplace_id = ? AND id NOT IN
+                    (SELECT id FROM schedule_cache WHERE workplace_id = ?
+                     ORDER BY id DESC LIMIT ?)''', (workplace_id, workplace_id, CACHE_ENTRIES))
+
+
+def generate_range(conn, workplace, start_date, end_date, save=False, cache=True,
+                   progress=None, **options):
+    """Generate every date from start_date to end_date, optionally persisting it
+
+    Unchanged inputs return the cached result of an earlier run (see
+    fingerprint); cache=False always recomputes. options go to
+    assign_shifts (mode, max_shifts, slot_minutes, max_hours). Returns a
+    DaySchedule per date (see assign_range).
+    """
+    with instrument.run('generate', workplace=workplace, mode=options.get('mode', 'greedy')):
+        with instrument.span('load'):
+            workplace_id = get_workplace_id(conn, workplace)
+            shifts_data, availability_data = load_inputs(conn, workplace_id)
+            exceptions = load_exceptions(conn, workplace_id, start_date, end_date)
+            if options.get('mode') == 'balanced':
+                options['limits'] = load_limits(conn, workplace_id)
+        instrument.count('rows read', len(shifts_data) + len(availability_data))
+
+        with instrument.span('cache lookup'):
+            key = fingerprint(shifts_data, availability_data, exceptions, start_date, end_date, options)
+            days = cached_range(conn, workplace_id, key) if cache else None
+        computed = days is None
+        if cache:
+            instrument.count('cache misses' if computed else 'cache hits')
+
+        if computed:
+            with instrument.span('assign'):
+                days = assign_range(shifts_data, availability_data, start_date, end_date, exceptions,
+                                    progress=progress, **options)
+
+        if save or (computed and cache):
+            with instrument.span('save'):
+                c = conn.cursor()
+                try:
+                    if computed and cache:
+                        store_range(c, workplace_id, key, days)
+                    if save:
+                        write_range(c, workplace_id, days)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+
+    return days
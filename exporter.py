@@ -0,0 +1,374 @@
+"""Write schedules to files straight from engine.DaySchedules
+
+Used by the GUI and the command line alike, without anything on screen.
+Formats:
+
+    .xlsx   a workbook with a sheet per workplace and week (or workplace)
+    .csv    one row per assignment, for payroll
+    .jsonl  one JSON object per assignment
+    ics     a folder of per-worker iCalendar feeds, only changed ones rewritten
+
+Every writer streams: workbooks use openpyxl's write-only mode, the
+others write each row as it is produced, and schedules can be given as
+a generator that loads one workplace at a time, so memory stays flat no
+matter how many workplaces and weeks are exported.
+"""
+import csv
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+import os
+import re
+
+import engine
+import incremental
+import instrument
+
+# how a workbook is split into sheets
+BY_WEEK = 'week'
+BY_WORKPLACE = 'workplace'
+SHEET_LAYOUTS = [BY_WEEK, BY_WORKPLACE]
+
+FORMATS = ['xlsx', 'csv', 'jsonl', 'ics']
+
+# what export's count is a count of, per format
+UNITS = {'xlsx': "sheets", 'csv': "assignments", 'jsonl': "assignments", 'ics': "calendar feeds"}
+
+ASSIGNMENT_COLUMNS = ['Workplace', 'Date', 'Day', 'Start', 'End', 'Hours', 'Worker ID', 'Name']
+
+# per-feed content hashes of the last ics export, kept in the feed folder
+ICS_MANIFEST = '.manifest.json'
+
+# Excel limits sheet titles to 31 characters and forbids a few of them
+SHEET_TITLE_LENGTH = 31
+SHEET_TITLE_FORBIDDEN = re.compile(r'[\[\]:*?/\\]')
+
+
+def weeks(days):
+    """Split a list of DaySchedules into runs of seven dates"""
+    for i in range(0, len(days), 7):
+        yield days[i:i + 7]
+
+
+def week_header(week):
+    """Column titles of a week: 'Time', then each day with its date"""
+    dates = {d.day: d.date for d in week}
+    return ["Time"] + [f"{day} {dates[day]}" if day in dates else day for day in engine.DAYS]
+
+
+def week_rows(week):
+    """One row per shift of a week, names joined by newlines, like the schedule tab"""
+    return engine.schedule_rows(engine.week_grid(week))
+
+
+def sheet_title(text, used):
+    """A valid sheet title for text that no earlier sheet has, remembered in used"""
+    title = SHEET_TITLE_FORBIDDEN.sub('-', text).strip("'")[:SHEET_TITLE_LENGTH] or "Sheet"
+    base = title
+    n = 2
+    while title.lower() in used:
+        suffix = f" ({n})"
+        title = base[:SHEET_TITLE_LENGTH - len(suffix)] + suffix
+        n += 1
+    used.add(title.lower())
+    return title
+
+
+def iter_sheets(schedules, by=BY_WEEK):
+    """Yield (sheet title, rows) for {workplace: DaySchedules} or (workplace, days) pairs
+
+    by=BY_WEEK gives a sheet per workplace and week; BY_WORKPLACE one
+    sheet per workplace with its weeks one below the other. rows are
+    generated as the sheet is written.
+    """
+    if isinstance(schedules, dict):
+        schedules = schedules.items()
+
+    used = set()
+    for workplace, days in schedules:
+        if by == BY_WORKPLACE:
+            yield sheet_title(workplace, used), _stacked_rows(days)
+        elif by == BY_WEEK:
+            for week in weeks(days):
+                # keep the date whole and shorten the workplace name if needed
+                name = workplace[:SHEET_TITLE_LENGTH - len(week[0].date) - 1]
+                yield sheet_title(f"{name} {week[0].date}", used), _week_with_header(week)
+        else:
+            raise ValueError(f"Unknown sheet layout: {by}")
+
+
+def _week_with_header(week):
+    yield week_header(week)
+    yield from week_rows(week)
+
+
+def _stacked_rows(days):
+    for n, week in enumerate(weeks(days)):
+        if n:
+            yield []
+        yield from _week_with_header(week)
+
+
+def write_excel(filename, schedules, by=BY_WEEK, progress=None):
+    """Stream schedules into one .xlsx workbook; returns the number of sheets"""
+    from openpyxl import Workbook
+
+    # write-only sheets go straight to disk instead of building cells in memory
+    workbook = Workbook(write_only=True)
+    sheets = 0
+    rows = 0
+    with instrument.span('write'):
+        for title, sheet_rows in iter_sheets(schedules, by):
+            sheet = workbook.create_sheet(title)
+            for row in sheet_rows:
+                sheet.append(row)
+                rows += 1
+            sheets += 1
+            if progress:
+                progress.update(message=f"Wrote sheet {title}")
+
+        if not sheets:
+            # a workbook needs at least one sheet
+            workbook.create_sheet("Schedule").append(["Time"] + engine.DAYS)
+
+    with instrument.span('save'):
+        workbook.save(filename)
+    instrument.count('rows written', rows)
+    return sheets
+
+
+def assignment_rows(schedules):
+    """Yield (workplace, DaySchedule, Assignment) in date order per workplace"""
+    if isinstance(schedules, dict):
+        schedules = schedules.items()
+
+    for workplace, days in schedules:
+        for d in days:
+            for a in sorted(d.assignments, key=lambda a: (a.start_time, a.end_time, a.name)):
+                yield workplace, d, a
+
+
+def write_csv(filename, schedules, progress=None):
+    """One row per assignment (ASSIGNMENT_COLUMNS); returns the number of rows"""
+    rows = 0
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(ASSIGNMENT_COLUMNS)
+        for workplace, d, a in assignment_rows(schedules):
+            writer.writerow([workplace, d.date, d.day,
+                             engine.minutes_to_time(a.start_time), engine.minutes_to_time(a.end_time),
+                             (a.end_time - a.start_time) / 60, a.worker_id, a.name])
+            rows += 1
+            if progress and rows % 10000 == 0:
+                progress.update(message=f"Wrote {rows} assignments")
+    instrument.count('rows written', rows)
+    return rows
+
+
+def write_jsonl(filename, schedules, progress=None):
+    """One JSON object per line and assignment; returns the number of lines
+
+    Times are given both as labels and as minutes since midnight (an end
+    of 1440 is midnight at the end of the day).
+    """
+    rows = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        for workplace, d, a in assignment_rows(schedules):
+            f.write(json.dumps({
+                'workplace': workplace,
+                'date': d.date,
+                'day': d.day,
+                'start': engine.minutes_to_time(a.start_time),
+                'end': engine.minutes_to_time(a.end_time),
+                'start_minute': a.start_time,
+                'end_minute': a.end_time,
+                'worker_id': a.worker_id,
+                'name': a.name,
+            }) + "\n")
+            rows += 1
+            if progress and rows % 10000 == 0:
+                progress.update(message=f"Wrote {rows} assignments")
+    instrument.count('rows written', rows)
+    return rows
+
+
+def _ics_text(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _ics_fold(line):
+    """Split a content line longer than 75 octets into continuation lines"""
+    data = line.encode()
+    if len(data) <= 75:
+        return line
+    parts = []
+    while data:
+        size = 75 if not parts else 74
+        # do not cut a UTF-8 sequence in half
+        while size < len(data) and (data[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(data[:size].decode())
+        data = data[size:]
+    return "\r\n ".join(parts)
+
+
+def _ics_time(date, minutes):
+    """Local (floating) date-time of a minute of a date; 1440 is the next midnight"""
+    if minutes < 24 * 60:
+        return f"{date.replace('-', '')}T{minutes // 60:02d}{minutes % 60:02d}00"
+    moment = datetime.strptime(date, "%Y-%m-%d") + timedelta(minutes=minutes)
+    return moment.strftime("%Y%m%dT%H%M%S")
+
+
+def ics_events(workplace, events):
+    """The VEVENT lines of one worker's (date, start, end, worker id) assignments"""
+    lines = []
+    for date, start, end, worker_id in events:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{date}-{start}-{end}-{worker_id}@schedule",
+            f"DTSTART:{_ics_time(date, start)}",
+            f"DTEND:{_ics_time(date, end)}",
+            f"SUMMARY:{_ics_text(workplace)} shift",
+            "END:VEVENT",
+        ]
+    return lines
+
+
+def ics_feed(name, event_lines, stamp):
+    """A whole calendar for one worker, CRLF line endings as RFC 5545 wants"""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Schedule//Work Schedule//EN",
+             f"X-WR-CALNAME:{_ics_text(name)} shifts"]
+    for line in event_lines:
+        lines.append(line)
+        if line == "BEGIN:VEVENT":
+            lines.append(f"DTSTAMP:{stamp}")
+    lines.append("END:VCALENDAR")
+    return "".join(_ics_fold(line) + "\r\n" for line in lines)
+
+
+def feed_filename(worker_id, name):
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or "worker"
+    return f"{worker_id}-{slug}.ics"
+
+
+def write_ics(folder, schedules, progress=None):
+    """Write a calendar feed per worker into folder; returns how many feeds were rewritten
+
+    Feeds whose events did not change since the last export into the
+    same folder are left alone (compared by a hash kept in
+    ICS_MANIFEST), so calendar apps only fetch the changed ones. A
+    worker of an exported workplace who had a feed but no shifts now
+    gets an empty one; feeds of other workplaces in the folder are
+    left as they are.
+    """
+    os.makedirs(folder, exist_ok=True)
+    manifest_file = os.path.join(folder, ICS_MANIFEST)
+    try:
+        with open(manifest_file, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if not isinstance(manifest, dict):
+        manifest = {}
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    seen = set()
+    written = 0
+
+    def write_feed(filename, workplace, name, event_lines):
+        nonlocal written
+        seen.add(filename)
+        digest = hashlib.sha256("\n".join(event_lines).encode()).hexdigest()
+        if (manifest.get(filename, {}).get('hash') == digest
+                and os.path.exists(os.path.join(folder, filename))):
+            return
+        with open(os.path.join(folder, filename), 'w', newline='', encoding='utf-8') as f:
+            f.write(ics_feed(name, event_lines, stamp))
+        manifest[filename] = {'hash': digest, 'name': name, 'workplace': workplace}
+        written += 1
+
+    if isinstance(schedules, dict):
+        schedules = schedules.items()
+
+    exported = set()
+    for workplace, days in schedules:
+        exported.add(workplace)
+        by_worker = {}
+        for d in days:
+            for a in d.assignments:
+                by_worker.setdefault((a.worker_id, a.name), []).append(
+                    (d.date, a.start_time, a.end_time, a.worker_id))
+
+        for (worker_id, name), events in by_worker.items():
+            events.sort()
+            write_feed(feed_filename(worker_id, name), workplace, name, ics_events(workplace, events))
+        if progress:
+            progress.update(message=f"Wrote calendars of {workplace}")
+
+    # workers belong to one workplace, so only the exported workplaces' feeds can be stale
+    for filename, entry in list(manifest.items()):
+        if filename not in seen and entry.get('workplace') in exported:
+            # no shifts any more: empty the feed rather than leave old shifts behind
+            write_feed(filename, entry['workplace'], entry.get('name', ''), [])
+
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+    instrument.count('feeds written', written)
+    instrument.count('feeds unchanged', len(seen) - written)
+    return written
+
+
+def format_of(target, format=None):
+    """The export format for a target path: format if given, else from the extension
+
+    A target without an extension (a folder) means ics feeds.
+    """
+    if format:
+        if format not in FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        return format
+
+    extension = os.path.splitext(target)[1].lower().lstrip('.')
+    if extension in FORMATS:
+        return extension
+    if not extension or os.path.isdir(target):
+        return 'ics'
+    raise ValueError(f"Cannot export to '{target}': use .xlsx, .csv, .jsonl or a folder for .ics feeds")
+
+
+def export(target, schedules, by=BY_WEEK, progress=None, format=None):
+    """Write schedules to target in the format its extension names (see format_of)
+
+    schedules is {workplace: DaySchedules} or an iterable of (workplace,
+    DaySchedules) pairs, e.g. saved_schedules(). by only applies to
+    workbooks. Returns how many UNITS[format] were written.
+    """
+    format = format_of(target, format)
+    with instrument.run('export', file=target, format=format):
+        if format == 'xlsx':
+            return write_excel(target, schedules, by, progress)
+        if format == 'csv':
+            return write_csv(target, schedules, progress)
+        if format == 'jsonl':
+            return write_jsonl(target, schedules, progress)
+        return write_ics(target, schedules, progress)
+
+
+def saved_schedules(conn, workplaces, start_date, end_date=None):
+    """Yield (workplace, DaySchedules) of the saved schedules, one workplace at a time
+
+    Covers one week when end_date is not given. Workplaces with nothing
+    saved in the range are skipped.
+    """
+    if end_date is None:
+        end_date = start_date + timedelta(days=6)
+
+    for workplace in workplaces:
+        workplace_id = engine.get_workplace_id(conn, workplace)
+        with instrument.span('load'):
+            days = incremental.saved_days(conn, workplace_id, start_date, end_date)
+        if days is not None:
+            yield workplace, days
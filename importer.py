@@ -0,0 +1,298 @@
+"""Bulk import of workers and availability from roster spreadsheets"""
+import pandas as pd
+
+import engine
+import instrument
+from timeparse import TIME_LABELS, parse_series
+
+REQUIRED_COLUMNS = ['First Name', 'Last Name', 'Email']
+
+# rows per batch for streaming imports
+BATCH_SIZE = 5000
+
+# rejected rows and skipped cells kept as examples; beyond this they are only counted
+EXAMPLES = 100
+
+
+class ImportReport:
+    """Counts and reasons collected while importing a roster"""
+
+    def __init__(self):
+        self.imported = 0
+        self.availability = 0
+        self.rejected_count = 0
+        self.skipped_count = 0
+        self.rejected = []   # first (where, reason) of rows that were not imported
+        self.skipped = []    # first (where, reason) of availability cells that were ignored
+
+    def reject(self, where, reason):
+        self.rejected_count += 1
+        if len(self.rejected) < EXAMPLES:
+            self.rejected.append((where, reason))
+
+    def skip(self, where, reason):
+        self.skipped_count += 1
+        if len(self.skipped) < EXAMPLES:
+            self.skipped.append((where, reason))
+
+    def add(self, other):
+        self.imported += other.imported
+        self.availability += other.availability
+        self.rejected_count += other.rejected_count
+        self.skipped_count += other.skipped_count
+        self.rejected.extend(other.rejected[:EXAMPLES - len(self.rejected)])
+        self.skipped.extend(other.skipped[:EXAMPLES - len(self.skipped)])
+
+    def summary(self, limit=10):
+        """Short human readable summary, listing at most limit problems"""
+        lines = [f"Imported {self.imported} workers with {self.availability} availability windows"]
+        if self.rejected_count:
+            lines.append(f"Rejected {self.rejected_count} rows:")
+            lines.extend(f"  {where}: {reason}" for where, reason in self.rejected[:limit])
+        if self.skipped_count:
+            lines.append(f"Skipped {self.skipped_count} availability entries:")
+            lines.extend(f"  {where}: {reason}" for where, reason in self.skipped[:limit])
+        return "\n".join(lines)
+
+
+def _where(sheet, row):
+    """Location of a spreadsheet row for the report"""
+    return f"{sheet} row {row}" if sheet else f"row {row}"
+
+
+def _write_frame(c, workplace_id, df, rows, sheet, report, progress=None):
+    """Validate one DataFrame of roster rows and insert it with executemany
+
+    rows are the spreadsheet row numbers of df's rows, for the report.
+    Runs inside the caller's transaction.
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    df = df.reset_index(drop=True)
+    row_numbers = pd.Index(rows)
+
+    # reject rows without a name or email
+    ok = df[REQUIRED_COLUMNS].notna().all(axis=1)
+    for col in REQUIRED_COLUMNS:
+        ok &= df[col].astype(str).str.strip() != ''
+    for row in row_numbers[~ok.to_numpy()]:
+        report.reject(_where(sheet, row), "missing first name, last name or email")
+
+    df = df[ok.to_numpy()]
+    row_numbers = row_numbers[ok.to_numpy()]
+
+    if 'Work Study' in df.columns:
+        work_study = df['Work Study'].fillna('').astype(str).str.strip().str.upper() == 'Y'
+    else:
+        work_study = pd.Series(False, index=df.index)
+
+    # optional targets for the balanced mode
+    if 'Preferred Shifts' in df.columns:
+        preferred = pd.to_numeric(df['Preferred Shifts'], errors='coerce').fillna(0).astype(int).tolist()
+    else:
+        preferred = [0] * len(df)
+
+    if 'Max Hours' in df.columns:
+        max_hours = [None if pd.isna(hours) else int(hours)
+                     for hours in pd.to_numeric(df['Max Hours'], errors='coerce')]
+    else:
+        max_hours = [None] * len(df)
+
+    # reserve a block of ids so availability rows can reference them without lastrowid
+    c.execute('SELECT COALESCE(MAX(id), 0) FROM workers')
+    first_id = c.fetchone()[0] + 1
+    worker_ids = range(first_id, first_id + len(df))
+
+    instrument.count('rows read', len(df))
+
+    with instrument.span('insert'):
+        c.executemany('''INSERT INTO workers
+                        (id, workplace_id, first_name, last_name, email, work_study,
+                         preferred_shifts, max_hours)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                      zip(worker_ids,
+                          [workplace_id] * len(df),
+                          df['First Name'].astype(str).str.strip().tolist(),
+                          df['Last Name'].astype(str).str.strip().tolist(),
+                          df['Email'].astype(str).str.strip().tolist(),
+                          work_study.tolist(),
+                          preferred,
+                          max_hours))
+    report.imported += len(df)
+
+    for day in engine.DAYS:
+        if day not in df.columns:
+            continue
+
+        column = df[day]
+        present = column.notna() & (column.astype(str).str.strip().str.lower() != 'na')
+        column = column[present]
+        if column.empty:
+            continue
+
+        ids = [worker_ids[i] for i in present.to_numpy().nonzero()[0]]
+        rows = row_numbers[present.to_numpy()]
+        with instrument.span('parse'):
+            start, end, errors = parse_series(column)
+
+        for row, value in zip(rows[errors], column[errors].tolist()):
+            report.skip(_where(sheet, row), f"{day}: cannot parse '{value}'")
+
+        keep = ~errors
+        starts = start[keep].tolist()
+        ends = end[keep].tolist()
+        with instrument.span('insert'):
+            c.executemany('''INSERT INTO availability
+                            (worker_id, day, start_time, end_time, start_minute, end_minute)
+                            VALUES (?, ?, ?, ?, ?, ?)''',
+                          zip([worker_id for worker_id, k in zip(ids, keep) if k],
+                              [day] * len(starts),
+                              [TIME_LABELS[m] for m in starts],
+                              [TIME_LABELS[m] for m in ends],
+                              starts,
+                              ends))
+        report.availability += len(starts)
+
+        if progress:
+            progress.update(message=f"Imported {report.imported} workers ({day} availability)")
+
+    if progress:
+        progress.update(done=report.imported, message=f"Imported {report.imported} workers")
+
+
+def import_frame(conn, workplace_id, df, first_row=2, progress=None):
+    """Validate and insert one DataFrame of roster rows in a single transaction
+
+    first_row is the spreadsheet row number of df's first row, used in
+    the report (row 1 is the header). Blank rows are skipped, as in
+    import_stream. progress is an optional tasks.Progress; cancelling it
+    rolls the import back.
+    """
+    report = ImportReport()
+    rows, df = _without_blank_rows([first_row + n for n in range(len(df))], df)
+
+    with instrument.run('import', rows=len(df)):
+        c = conn.cursor()
+        c.execute('BEGIN IMMEDIATE')
+        try:
+            if progress:
+                progress.update(done=0, total=len(df), message="Importing workers")
+            _write_frame(c, workplace_id, df, rows, None, report, progress)
+            with instrument.span('commit'):
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return report
+
+
+def import_excel(conn, workplace_id, filename, progress=None):
+    """Import every worker in an Excel roster into a workplace"""
+    with instrument.run('import', file=filename):
+        with instrument.span('read'):
+            df = pd.read_excel(filename)
+        return import_frame(conn, workplace_id, df, progress=progress)
+
+
+def _without_blank_rows(rows, df):
+    """(row numbers, DataFrame) without the rows that are entirely empty"""
+    filled = df.notna().any(axis=1).to_numpy()
+    return [row for row, keep in zip(rows, filled) if keep], df[filled]
+
+
+def iter_excel_batches(filename, batch_size=BATCH_SIZE):
+    """Yield (sheet, row numbers, DataFrame) chunks from every sheet of a workbook
+
+    Blank rows are left out, so each DataFrame row comes with its own
+    spreadsheet row number. Uses openpyxl's read-only mode, so only one
+    batch of rows is held in memory at a time no matter how large the
+    file is.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                continue
+            header = [str(col).strip() if col is not None else '' for col in header]
+
+            batch = []
+            numbers = []
+            for number, values in enumerate(rows, start=2):
+                if not any(v is not None for v in values):
+                    continue
+                numbers.append(number)
+                batch.append(tuple(values[:len(header)]) + (None,) * (len(header) - len(values)))
+                if len(batch) >= batch_size:
+                    yield sheet.title, numbers, pd.DataFrame(batch, columns=header)
+                    batch = []
+                    numbers = []
+            if batch:
+                yield sheet.title, numbers, pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_csv_batches(filename, batch_size=BATCH_SIZE):
+    """Yield (None, row numbers, DataFrame) chunks from a CSV roster
+
+    Blank lines are read and then dropped, so the numbers stay those of
+    the file's lines (line 1 is the header).
+    """
+    for chunk in pd.read_csv(filename, chunksize=batch_size, skip_blank_lines=False):
+        rows, chunk = _without_blank_rows((chunk.index + 2).tolist(), chunk)
+        if rows:
+            yield None, rows, chunk
+
+
+def import_stream(conn, workplace_id, filename, batch_size=BATCH_SIZE, progress=None):
+    """Import a roster in fixed-size batches with bounded memory
+
+    Handles .xlsx (every sheet) and .csv files with the same columns as
+    import_excel. All batches are written in one transaction. Sheets
+    without the required columns are skipped and reported. progress is
+    an optional tasks.Progress; cancelling it rolls the import back.
+    """
+    if filename.lower().endswith('.csv'):
+        batches = iter_csv_batches(filename, batch_size)
+    else:
+        batches = iter_excel_batches(filename, batch_size)
+
+    report = ImportReport()
+    bad_sheets = set()
+
+    with instrument.run('import', file=filename):
+        c = conn.cursor()
+        c.execute('BEGIN IMMEDIATE')
+        try:
+            while True:
+                # reading the file is its own phase, so time each batch as it is pulled
+                with instrument.span('read'):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+
+                sheet, rows, df = batch
+                if sheet in bad_sheets:
+                    continue
+                missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+                if missing:
+                    if sheet is None:
+                        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+                    bad_sheets.add(sheet)
+                    report.reject(sheet, f"missing required columns: {', '.join(missing)}")
+                    continue
+                _write_frame(c, workplace_id, df, rows, sheet, report, progress)
+            with instrument.span('commit'):
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return report
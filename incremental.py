@@ -0,0 +1,310 @@
+"""Repair a saved schedule after its inputs changed, keeping everyone else's shifts
+
+Instead of solving the workplace again, the assignments already in the
+schedules table are checked against the current shifts, exceptions and
+availability. Assignments that still fit are kept as they are; the rest
+are dropped, and only the positions left open are filled. Only those
+changes are written back.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from interval_index import build_day_indexes
+import engine
+import instrument
+from timeparse import time_to_minutes
+
+# what reschedule did: DaySchedule per date, and the Changes added and removed
+Reschedule = namedtuple('Reschedule', ['days', 'added', 'removed'])
+
+# one assignment that was added to or removed from the saved schedule
+Change = namedtuple('Change', ['date', 'start_time', 'end_time', 'worker_id', 'name'])
+
+
+def load_saved(conn, workplace_id, first_date, last_date):
+    """Saved assignments as {date string: [(start, end, worker id, name)]}"""
+    c = conn.cursor()
+    c.execute('''SELECT s.date, s.start_time, s.end_time, s.worker_id,
+                       w.first_name, w.last_name
+                FROM schedules s
+                LEFT JOIN workers w ON w.id = s.worker_id
+                WHERE s.workplace_id = ? AND s.date BETWEEN ? AND ?
+                ORDER BY s.id''', (workplace_id, first_date.strftime("%Y-%m-%d"),
+                                   last_date.strftime("%Y-%m-%d")))
+
+    # a few distinct labels repeat on every row
+    starts = {}
+    ends = {}
+    saved = {}
+    for date, start_time, end_time, worker_id, first_name, last_name in c:
+        if start_time not in starts:
+            starts[start_time] = time_to_minutes(start_time)
+        if end_time not in ends:
+            ends[end_time] = time_to_minutes(end_time, end=True)
+
+        # the worker may have been deleted since
+        name = f"{first_name} {last_name}" if first_name is not None else f"worker {worker_id}"
+        saved.setdefault(date, []).append((starts[start_time], ends[end_time], worker_id, name))
+
+    return saved
+
+
+def saved_days(conn, workplace_id, start_date, end_date):
+    """The saved schedule from start_date to end_date as a DaySchedule per date
+
+    Shifts and positions are today's, including that range's exceptions,
+    so dates with nothing saved still list their shifts. Returns None
+    when nothing is saved in the range.
+    """
+    saved = load_saved(conn, workplace_id, start_date, end_date)
+    if not saved:
+        return None
+
+    c = conn.cursor()
+    c.execute('''SELECT day, start_minute, end_minute, positions
+                FROM shifts
+                WHERE workplace_id = ? AND start_minute IS NOT NULL''', (workplace_id,))
+    weekly = {}
+    for day, start, end, positions in c.fetchall():
+        weekly.setdefault(day, []).append((start, end, positions))
+    exceptions = engine.load_exceptions(conn, workplace_id, start_date, end_date)
+
+    days = []
+    for offset in range((end_date - start_date).days + 1):
+        date = start_date + timedelta(days=offset)
+        date_str = date.strftime("%Y-%m-%d")
+        day = engine.day_name(date)
+        shifts = engine.shifts_on(weekly, day, exceptions.get(date_str, ([], [])))
+        assignments = [engine.Assignment(day, start, end, worker_id, name)
+                       for start, end, worker_id, name in saved.get(date_str, ())]
+        days.append(engine.DaySchedule(date_str, day, shifts, assignments))
+    return days
+
+
+def repair_range(shifts_data, availability_data, start_date, end_date, exceptions, saved,
+                 max_shifts=None, mode='greedy', max_hours=None, limits=None, progress=None,
+                 check=None):
+    """Keep the saved assignments that still fit and fill what is left open
+
+    An assignment is kept while its worker still exists and is available
+    for the whole shift, and the shift still exists on that date with
+    enough positions. Open positions go to available workers who are
+    not already booked at an overlapping time that date, nor over
+    max_shifts in that week, ranked the way mode ranks them: work study
+    first for greedy, vectorized and optimal; for balanced work study
+    first, then below preferred_shifts, then fewest minutes that week,
+    and nobody over their weekly hour cap (limits as from
+    engine.load_limits, else max_hours). Returns a Reschedule.
+
+    progress, if given, is a tasks.Progress told how many dates are
+    done; check (e.g. Progress.check) is called for every open shift,
+    so a long repair can be cancelled part way.
+    """
+    if mode not in engine.MODES:
+        raise ValueError(f"Unknown scheduling mode: {mode}")
+    limits = limits or {}
+
+    weekly = {}
+    for day, start, end, positions in shifts_data:
+        weekly.setdefault(day, []).append((start, end, positions))
+
+    workers = {}
+    windows = {}
+    windows_by_day = {}
+    for worker_id, fname, lname, work_study, day, start, end in availability_data:
+        workers[worker_id] = (work_study, f"{fname} {lname}")
+        windows.setdefault((worker_id, day), []).append((start, end))
+        windows_by_day.setdefault(day, []).append((start, end, worker_id))
+
+    def fits(worker_id, day, start, end):
+        return any(s <= start and end <= e for s, e in windows.get((worker_id, day), ()))
+
+    def rank(worker_id):
+        return workers[worker_id]
+
+    def hour_cap(worker_id):
+        if mode != 'balanced':
+            return None
+        own = limits.get(worker_id, (0, None))[1]
+        hours = own if own is not None else max_hours
+        return hours * 60 if hours is not None else None
+
+    no_exceptions = ([], [])
+    added = []
+    removed = []
+
+    # first keep what still fits, so max_shifts sees the whole week before filling
+    dates = []
+    week_load = {}
+    week_minutes = {}
+    for offset in range((end_date - start_date).days + 1):
+        date = start_date + timedelta(days=offset)
+        date_str = date.strftime("%Y-%m-%d")
+        day = engine.day_name(date)
+        shifts = engine.shifts_on(weekly, day, exceptions.get(date_str, no_exceptions))
+
+        positions = {}
+        for start, end, count in shifts:
+            positions[(start, end)] = positions.get((start, end), 0) + count
+
+        kept = {key: [] for key in positions}
+        for start, end, worker_id, name in saved.get(date_str, ()):
+            key = (start, end)
+            if (worker_id in workers and key in positions and worker_id not in kept[key]
+                    and fits(worker_id, day, start, end)):
+                kept[key].append(worker_id)
+            else:
+                removed.append(Change(date_str, start, end, worker_id, name))
+
+        # fewer positions than before: drop the lowest ranked
+        for key, worker_ids in kept.items():
+            if len(worker_ids) > positions[key]:
+                worker_ids.sort(key=rank, reverse=True)
+                for worker_id in worker_ids[positions[key]:]:
+                    removed.append(Change(date_str, key[0], key[1], worker_id, workers[worker_id][1]))
+                del worker_ids[positions[key]:]
+
+        # max_shifts counts per seven days from start_date, like assign_range's weeks
+        load = week_load.setdefault(offset // 7, {})
+        minutes = week_minutes.setdefault(offset // 7, {})
+        for (start, end), worker_ids in kept.items():
+            for worker_id in worker_ids:
+                load[worker_id] = load.get(worker_id, 0) + 1
+                minutes[worker_id] = minutes.get(worker_id, 0) + end - start
+
+        dates.append((offset, date_str, day, shifts, positions, kept))
+
+    # then fill the open positions only
+    index = None
+    days = []
+    for offset, date_str, day, shifts, positions, kept in dates:
+        if progress:
+            progress.update(done=offset, total=len(dates), message=f"Repairing {date_str}")
+        load = week_load[offset // 7]
+        minutes = week_minutes[offset // 7]
+
+        def balanced_rank(worker_id):
+            work_study, name = workers[worker_id]
+            target = limits.get(worker_id, (0, None))[0]
+            reached = 1 if target and load.get(worker_id, 0) >= target else 0
+            return (0 if work_study else 1, reached, minutes.get(worker_id, 0), name, worker_id)
+
+        booked = {}
+        for (start, end), worker_ids in kept.items():
+            for worker_id in worker_ids:
+                booked.setdefault(worker_id, []).append((start, end))
+
+        for (start, end), worker_ids in kept.items():
+            open_positions = positions[(start, end)] - len(worker_ids)
+            if open_positions <= 0:
+                continue
+            if check:
+                check()
+
+            if index is None:
+                index = build_day_indexes(windows_by_day)
+            if day not in index:
+                continue
+
+            if mode == 'balanced':
+                candidates = sorted(set(index[day].covering(start, end)), key=balanced_rank)
+            else:
+                candidates = sorted(index[day].covering(start, end), key=rank, reverse=True)
+            for worker_id in candidates:
+                if open_positions == 0:
+                    break
+                if worker_id in worker_ids:
+                    continue
+                if any(s < end and start < e for s, e in booked.get(worker_id, ())):
+                    continue
+                if max_shifts is not None and load.get(worker_id, 0) >= max_shifts:
+                    continue
+                cap = hour_cap(worker_id)
+                if cap is not None and minutes.get(worker_id, 0) + end - start > cap:
+                    continue
+
+                worker_ids.append(worker_id)
+                booked.setdefault(worker_id, []).append((start, end))
+                load[worker_id] = load.get(worker_id, 0) + 1
+                minutes[worker_id] = minutes.get(worker_id, 0) + end - start
+                added.append(Change(date_str, start, end, worker_id, workers[worker_id][1]))
+                open_positions -= 1
+
+        assignments = [engine.Assignment(day, start, end, worker_id, workers[worker_id][1])
+                       for (start, end), worker_ids in kept.items() for worker_id in worker_ids]
+        days.append(engine.DaySchedule(date_str, day, shifts, assignments))
+
+    if progress:
+        progress.update(done=len(dates), total=len(dates))
+    return Reschedule(days, added, removed)
+
+
+def write_changes(c, workplace_id, result):
+    """Apply only the added and removed assignments to the schedules table"""
+    c.executemany('''DELETE FROM schedules WHERE id =
+                        (SELECT id FROM schedules
+                         WHERE workplace_id = ? AND worker_id = ? AND date = ?
+                               AND start_time = ? AND end_time = ?
+                         LIMIT 1)''',
+                  [(workplace_id, change.worker_id, change.date,
+                    engine.minutes_to_time(change.start_time), engine.minutes_to_time(change.end_time))
+                   for change in result.removed])
+
+    c.executemany('''INSERT INTO schedules
+                    (workplace_id, worker_id, date, start_time, end_time)
+                    VALUES (?, ?, ?, ?, ?)''',
+                  [(workplace_id, change.worker_id, change.date,
+                    engine.minutes_to_time(change.start_time), engine.minutes_to_time(change.end_time))
+                   for change in result.added])
+
+
+def reschedule(conn, workplace, start_date, end_date=None, save=True, max_shifts=None,
+               mode='greedy', max_hours=None, progress=None):
+    """Bring the saved schedule of a workplace up to date with its current inputs
+
+    Covers start_date to end_date inclusive (default: one week). Open
+    positions are filled by the rules of mode, with the same max_shifts
+    and max_hours the schedule was generated with (the schedules table
+    does not record them); balanced also honours each worker's own
+    limits. Only the assignments that changed are written. Returns a
+    Reschedule whose added and removed lists are the diff against the
+    saved schedule. progress (a tasks.Progress) is told which dates are
+    repaired, and cancelling it stops the repair before anything is
+    written.
+    """
+    if end_date is None:
+        end_date = start_date + timedelta(days=6)
+
+    with instrument.run('reschedule', workplace=workplace):
+        with instrument.span('load'):
+            workplace_id = engine.get_workplace_id(conn, workplace)
+            shifts_data, availability_data = engine.load_inputs(conn, workplace_id)
+            exceptions = engine.load_exceptions(conn, workplace_id, start_date, end_date)
+            saved = load_saved(conn, workplace_id, start_date, end_date)
+            limits = engine.load_limits(conn, workplace_id) if mode == 'balanced' else None
+        instrument.count('rows read', len(shifts_data) + len(availability_data)
+                         + sum(len(rows) for rows in saved.values()))
+
+        with instrument.span('repair'):
+            result = repair_range(shifts_data, availability_data, start_date, end_date, exceptions,
+                                  saved, max_shifts, mode, max_hours, limits, progress,
+                                  progress.check if progress else None)
+        instrument.count('added', len(result.added))
+        instrument.count('removed', len(result.removed))
+
+        if save and (result.added or result.removed):
+            with instrument.span('save'):
+                c = conn.cursor()
+                try:
+                    write_changes(c, workplace_id, result)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+
+    return result
+
+
+def describe(change):
+    """One line for a change, e.g. '2026-01-12 09:00 AM - 01:00 PM Jane Doe'"""
+    return f"{change.date} {engine.shift_key(change.start_time, change.end_time)} {change.name}"
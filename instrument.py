@@ -0,0 +1,181 @@
+"""Lightweight timing spans and counters for generate, import, view and export
+
+A Run collects how long each phase took and counts such as rows read or
+candidates evaluated:
+
+    with instrument.run('generate', workplace='Library'):
+        with instrument.span('load'):
+            ...
+        instrument.count('rows read', len(rows))
+
+Spans nest ('generate/load'), and a run started inside another run is
+recorded as a span of it. Code that is not inside a run pays for one
+thread-local lookup per span and count. When a log file is configured,
+finished runs are appended to it as one JSON object per line.
+configure(profile=...) captures a cProfile dump of the next run.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import threading
+import time
+
+# environment variables read by configure_from_env, e.g. for the GUI
+LOG_ENV = 'SCHEDULER_METRICS_LOG'
+PROFILE_ENV = 'SCHEDULER_PROFILE'
+
+_local = threading.local()
+_lock = threading.Lock()
+_log_file = None
+_profile_file = None
+
+
+class Run:
+    """Spans (seconds per phase) and counters of one operation"""
+
+    def __init__(self, name, **fields):
+        self.name = name
+        self.fields = fields
+        self.started = datetime.now()
+        self.spans = {}
+        self.counters = {}
+        self.seconds = None
+        self._begin = time.perf_counter()
+        self._path = []
+
+    @contextmanager
+    def span(self, name):
+        """Time a phase; spans opened inside it are recorded as 'name/inner'"""
+        self._path.append(name)
+        path = "/".join(self._path)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(path, time.perf_counter() - started)
+            self._path.pop()
+
+    def add(self, path, seconds):
+        self.spans[path] = self.spans.get(path, 0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self):
+        """Stop the clock and log the run"""
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self._begin
+            _record(self)
+        return self
+
+    def leaves(self):
+        """(span, seconds) for spans without inner spans, in the order they ended"""
+        return [(path, seconds) for path, seconds in self.spans.items()
+                if not any(other.startswith(path + "/") for other in self.spans)]
+
+    def summary(self):
+        """One line for the status bar, e.g. 'generate 1.20s: load 0.10s, assign 1.02s; 5000 rows read'"""
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self._begin
+        text = f"{self.name} {seconds:.2f}s"
+        leaves = self.leaves()
+        if leaves:
+            text += ": " + ", ".join(f"{path.rsplit('/', 1)[-1]} {s:.2f}s" for path, s in leaves)
+        if any(self.counters.values()):
+            text += "; " + ", ".join(f"{n:,} {name}" for name, n in self.counters.items() if n)
+        return text
+
+    def to_dict(self):
+        return {
+            'run': self.name,
+            'started': self.started.isoformat(timespec='milliseconds'),
+            'seconds': round(self.seconds, 6) if self.seconds is not None else None,
+            **self.fields,
+            'spans': {path: round(seconds, 6) for path, seconds in self.spans.items()},
+            'counters': dict(self.counters),
+        }
+
+
+def configure(log_file=None, profile=None):
+    """Log finished runs to log_file (JSON lines) and profile the next run into profile
+
+    Either can be None to turn it off. The profile is a cProfile dump
+    for pstats or snakeviz.
+    """
+    global _log_file, _profile_file
+    with _lock:
+        _log_file = log_file
+        _profile_file = profile
+
+
+def configure_from_env():
+    """configure() from SCHEDULER_METRICS_LOG and SCHEDULER_PROFILE"""
+    configure(os.environ.get(LOG_ENV) or None, os.environ.get(PROFILE_ENV) or None)
+
+
+def current():
+    """The run of the calling thread, or None"""
+    return getattr(_local, 'run', None)
+
+
+@contextmanager
+def run(name, **fields):
+    """Collect the spans and counts of the code inside as a Run, yielded
+
+    Inside another run this is just a span of that run.
+    """
+    outer = current()
+    if outer is not None:
+        with outer.span(name):
+            yield outer
+        return
+
+    profile = _take_profile()
+    r = Run(name, **fields)
+    _local.run = r
+    profiler = None
+    try:
+        if profile:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        yield r
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile)
+        _local.run = None
+        r.finish()
+
+
+@contextmanager
+def span(name):
+    """Time a phase of the calling thread's run, if there is one"""
+    r = current()
+    if r is None:
+        yield
+        return
+    with r.span(name):
+        yield
+
+
+def count(name, n=1):
+    """Add to a counter of the calling thread's run, if there is one"""
+    r = current()
+    if r is not None:
+        r.count(name, n)
+
+
+def _take_profile():
+    """The profile file for this run, once: later runs are not profiled"""
+    global _profile_file
+    with _lock:
+        profile, _profile_file = _profile_file, None
+    return profile
+
+
+def _record(r):
+    with _lock:
+        if _log_file:
+            with open(_log_file, 'a') as f:
+                f.write(json.dumps(r.to_dict(), default=str) + "\n")
@@ -0,0 +1,33 @@
+"""Index of availability windows for fast "who can cover this shift" lookups"""
+from bisect import bisect_right
+
+
+class IntervalIndex:
+    """Static index over (start, end, item) windows for one day
+
+    Windows are sorted by start, so a query for [start, end] cuts the
+    list down to windows starting no later than ``start`` with one
+    bisect and checks the end of each of those. Availability windows are
+    long and shifts short, so nearly every such window covers the shift
+    and a plain scan beats any tree walk over them.
+    """
+
+    def __init__(self, windows):
+        windows = sorted(windows, key=lambda w: w[0])
+        self._starts = [w[0] for w in windows]
+        self._ends = [w[1] for w in windows]
+        self._items = [w[2] for w in windows]
+
+    def __len__(self):
+        return len(self._items)
+
+    def covering(self, start, end):
+        """Return the items whose window contains all of [start, end], in start order"""
+        limit = bisect_right(self._starts, start)
+        return [item for window_end, item in zip(self._ends[:limit], self._items)
+                if window_end >= end]
+
+
+def build_day_indexes(windows_by_day):
+    """Build one IntervalIndex per day from {day: [(start, end, item), ...]}"""
+    return {day: IntervalIndex(windows) for day, windows in windows_by_day.items()}
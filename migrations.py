@@ -0,0 +1,191 @@
+"""Versioned schema migrations for data/schedule.db
+
+The schema version is kept in SQLite's user_version. Each migration
+runs once, in its own transaction, and is written so that it also
+works on databases created by older versions of install.py or
+scheduler.py (which never recorded a version).
+"""
+import sqlite3
+import os
+
+from timeparse import time_to_minutes
+
+DAYS = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+
+
+def _columns(c, table):
+    return [row[1] for row in c.execute(f'PRAGMA table_info({table})')]
+
+
+def create_tables(c):
+    """1: one schema for install.py and scheduler.py databases"""
+    hours_columns = ",\n".join(f"{day}_open TEXT,\n{day}_close TEXT" for day in DAYS)
+
+    c.execute(f'''CREATE TABLE IF NOT EXISTS workplaces
+                 (id INTEGER PRIMARY KEY,
+                  name TEXT NOT NULL,
+                  {hours_columns})''')
+
+    # install.py made workplaces with a single hours_open/hours_close pair
+    if 'hours_open' in _columns(c, 'workplaces'):
+        c.execute(f'''CREATE TABLE workplaces_new
+                     (id INTEGER PRIMARY KEY,
+                      name TEXT NOT NULL,
+                      {hours_columns})''')
+        copied = ", ".join("hours_open, hours_close" for day in DAYS)
+        targets = ", ".join(f"{day}_open, {day}_close" for day in DAYS)
+        c.execute(f'''INSERT INTO workplaces_new (id, name, {targets})
+                     SELECT id, name, {copied} FROM workplaces''')
+        c.execute('DROP TABLE workplaces')
+        c.execute('ALTER TABLE workplaces_new RENAME TO workplaces')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS workers
+                (id INTEGER PRIMARY KEY,
+                 workplace_id INTEGER,
+                 first_name TEXT NOT NULL,
+                 last_name TEXT NOT NULL,
+                 email TEXT NOT NULL,
+                 work_study BOOLEAN NOT NULL,
+                 preferred_shifts INTEGER DEFAULT 0,
+                 FOREIGN KEY (workplace_id) REFERENCES workplaces(id))''')
+
+    # scheduler.py made workers without preferred_shifts
+    if 'preferred_shifts' not in _columns(c, 'workers'):
+        c.execute('ALTER TABLE workers ADD COLUMN preferred_shifts INTEGER DEFAULT 0')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS availability
+                (id INTEGER PRIMARY KEY,
+                 worker_id INTEGER,
+                 day TEXT NOT NULL,
+                 start_time TEXT NOT NULL,
+                 end_time TEXT NOT NULL,
+                 FOREIGN KEY (worker_id) REFERENCES workers(id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS shifts
+                (id INTEGER PRIMARY KEY,
+                 workplace_id INTEGER,
+                 day TEXT NOT NULL,
+                 start_time TEXT NOT NULL,
+                 end_time TEXT NOT NULL,
+                 positions INTEGER DEFAULT 1,
+                 FOREIGN KEY (workplace_id) REFERENCES workplaces(id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS schedules
+                (id INTEGER PRIMARY KEY,
+                 workplace_id INTEGER,
+                 worker_id INTEGER,
+                 date TEXT NOT NULL,
+                 start_time TEXT NOT NULL,
+                 end_time TEXT NOT NULL,
+                 FOREIGN KEY (workplace_id) REFERENCES workplaces(id),
+                 FOREIGN KEY (worker_id) REFERENCES workers(id))''')
+
+
+def add_minute_columns(c):
+    """2: minutes since midnight next to the text times, backfilled"""
+    for table in ('availability', 'shifts'):
+        columns = _columns(c, table)
+        if 'start_minute' not in columns:
+            c.execute(f'ALTER TABLE {table} ADD COLUMN start_minute INTEGER')
+        if 'end_minute' not in columns:
+            c.execute(f'ALTER TABLE {table} ADD COLUMN end_minute INTEGER')
+
+        c.execute(f'SELECT id, start_time, end_time FROM {table} '
+                  'WHERE start_minute IS NULL OR end_minute IS NULL')
+        updates = []
+        for row_id, start_time, end_time in c.fetchall():
+            try:
+                updates.append((time_to_minutes(start_time),
+                                time_to_minutes(end_time, end=True),
+                                row_id))
+            except ValueError:
+                # leave unparseable rows NULL so they are never scheduled
+                continue
+
+        c.executemany(f'UPDATE {table} SET start_minute = ?, end_minute = ? WHERE id = ?', updates)
+
+
+def add_indexes(c):
+    """3: indexes for the lookups every screen makes"""
+    c.execute('CREATE INDEX IF NOT EXISTS idx_workplaces_name ON workplaces(name)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_workers_workplace ON workers(workplace_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_workers_email ON workers(email)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_availability_worker_day ON availability(worker_id, day)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_shifts_workplace_day ON shifts(workplace_id, day)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_schedules_workplace_date ON schedules(workplace_id, date)')
+
+
+def add_shift_exceptions(c):
+    """4: per-date closures and one-off shifts"""
+    c.execute('''CREATE TABLE IF NOT EXISTS shift_exceptions
+                (id INTEGER PRIMARY KEY,
+                 workplace_id INTEGER,
+                 date TEXT NOT NULL,
+                 closed BOOLEAN NOT NULL DEFAULT 0,
+                 start_minute INTEGER,
+                 end_minute INTEGER,
+                 positions INTEGER DEFAULT 1,
+                 FOREIGN KEY (workplace_id) REFERENCES workplaces(id))''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_shift_exceptions_workplace_date '
+              'ON shift_exceptions(workplace_id, date)')
+
+
+def add_schedule_cache(c):
+    """5: generated results by input fingerprint"""
+    c.execute('''CREATE TABLE IF NOT EXISTS schedule_cache
+                (id INTEGER PRIMARY KEY,
+                 workplace_id INTEGER,
+                 fingerprint TEXT NOT NULL,
+                 result TEXT NOT NULL,
+                 FOREIGN KEY (workplace_id) REFERENCES workplaces(id))''')
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_schedule_cache_fingerprint '
+              'ON schedule_cache(workplace_id, fingerprint)')
+
+
+def add_max_hours(c):
+    """6: optional weekly hour cap per worker"""
+    if 'max_hours' not in _columns(c, 'workers'):
+        c.execute('ALTER TABLE workers ADD COLUMN max_hours INTEGER')
+
+
+# position in this list + 1 is the schema version a migration brings the database to
+MIGRATIONS = [
+    create_tables,
+    add_minute_columns,
+    add_indexes,
+    add_shift_exceptions,
+    add_schedule_cache,
+    add_max_hours,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def current_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(db_file):
+    """Create or upgrade the database at db_file to SCHEMA_VERSION"""
+    folder = os.path.dirname(db_file)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    # autocommit mode so each migration controls its own transaction;
+    # foreign keys stay off while tables are rebuilt
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    try:
+        version = current_version(conn)
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            c = conn.cursor()
+            c.execute('BEGIN IMMEDIATE')
+            try:
+                migration(c)
+                c.execute(f'PRAGMA user_version = {number}')
+                c.execute('COMMIT')
+            except Exception:
+                c.execute('ROLLBACK')
+                raise
+        return current_version(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,148 @@
+"""Workplaces, shifts and workers read once and kept in memory for the GUI
+
+Handlers look up the same workplace ID and redraw the same shift and
+worker lists over and over, so Repository keeps what it read in small
+LRU caches and the code that writes drops exactly the entries it made
+stale:
+
+    repo = Repository(database)
+    workplace_id = repo.workplace_id("Library")
+    rows = repo.shifts(workplace_id)
+    ...insert a shift...
+    repo.invalidate_shifts(workplace_id)
+
+Hits and misses are counted in the calling thread's instrument run as
+'<cache> cache hits' / '<cache> cache misses', and cache_info() has the
+totals since start.
+"""
+from collections import OrderedDict
+import threading
+
+import engine
+import instrument
+
+# workplaces whose shifts (and, separately, workers) are kept
+WORKPLACE_ENTRIES = 16
+
+
+class LRUCache:
+    """A dict of at most maxsize entries that forgets the least recently used"""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # bumped by pop and clear, so a load that raced with them is not kept
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        """The entry for key, calling load() to fill it on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                instrument.count(f"{self.name} cache hits")
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+        instrument.count(f"{self.name} cache misses")
+
+        # loaded outside the lock so a slow query does not hold up other threads
+        value = load()
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def info(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+class Repository:
+    """Cached reads of workplaces, shifts and workers over a db.Database"""
+
+    def __init__(self, database, entries=WORKPLACE_ENTRIES):
+        self.db = database
+        # the name -> ID map of every workplace is one entry
+        self._workplaces = LRUCache('workplaces', 1)
+        self._shifts = LRUCache('shifts', entries)
+        self._workers = LRUCache('workers', entries)
+
+    def workplaces(self):
+        """{name: id} of every workplace"""
+        return self._workplaces.get(None, self._load_workplaces)
+
+    def workplace_id(self, name):
+        """Look up a workplace ID by name, raising engine.ScheduleError if there is none"""
+        try:
+            return self.workplaces()[name]
+        except KeyError:
+            raise engine.ScheduleError(f"Workplace '{name}' not found") from None
+
+    def shifts(self, workplace_id):
+        """(id, day, start, end, positions) of the workplace's weekly shifts, Sunday first"""
+        return self._shifts.get(workplace_id, lambda: self._load_shifts(workplace_id))
+
+    def workers(self, workplace_id):
+        """engine.list_workers rows of the workplace, as a tuple"""
+        return self._workers.get(workplace_id, lambda: tuple(
+            engine.list_workers(self.db.connection(), workplace_id)))
+
+    def invalidate_workplaces(self):
+        """After a workplace is added, renamed or removed"""
+        self._workplaces.clear()
+
+    def invalidate_shifts(self, workplace_id):
+        self._shifts.pop(workplace_id)
+
+    def invalidate_workers(self, workplace_id):
+        self._workers.pop(workplace_id)
+
+    def clear(self):
+        for cache in (self._workplaces, self._shifts, self._workers):
+            cache.clear()
+
+    def cache_info(self):
+        """{cache: {'hits', 'misses', 'size', 'maxsize'}} since start"""
+        return {cache.name: cache.info()
+                for cache in (self._workplaces, self._shifts, self._workers)}
+
+    def _load_workplaces(self):
+        c = self.db.cursor()
+        c.execute('SELECT id, name FROM workplaces')
+        return {name: workplace_id for workplace_id, name in c.fetchall()}
+
+    def _load_shifts(self, workplace_id):
+        c = self.db.cursor()
+        c.execute('''SELECT id, day, start_time, end_time, positions
+                    FROM shifts
+                    WHERE workplace_id = ?
+                    ORDER BY CASE
+                        WHEN day = 'Sunday' THEN 1
+                        WHEN day = 'Monday' THEN 2
+                        WHEN day = 'Tuesday' THEN 3
+                        WHEN day = 'Wednesday' THEN 4
+                        WHEN day = 'Thursday' THEN 5
+                        WHEN day = 'Friday' THEN 6
+                        WHEN day = 'Saturday' THEN 7
+                    END''', (workplace_id,))
+        return tuple(c.fetchall())
@@ -1,95 +1,145 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
 from datetime import datetime, timedelta
-import sqlite3
-import re
-import os
+
+import db
+import engine
+import exporter
+import incremental
+import instrument
+import migrations
+import repository
+import tasks
+from timeparse import time_to_minutes
+import validator
+from virtual_table import VirtualTable
 
 class SchedulerApp:
     def __init__(self, root):
         self.root = root
+        self.task = None
+        self.task_title = ""
+        self.task_run = None
+        # {workplace: DaySchedules} of the last generation or update, for export
+        self.shown_schedules = {}
+        self.workplace_names = []
+        self.workplace_dropdowns = []
         self.root.title("Work Schedule Manager")
         self.root.geometry("1200x800")
         
         # start the database connection
         self.db_file = 'data/schedule.db'
         self.ensure_database_exists()
+        self.db = db.Database(self.db_file)
+        # workplaces, shifts and workers as last read; every write below invalidates what it changed
+        self.repo = repository.Repository(self.db)
+        
+        # status bar for background operations (packed first so it keeps its space)
+        self.setup_status_bar()
         
         # make main notebook
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # make tabs
-        self.setup_workplace_tab()
-        self.setup_import_tab()
-        self.setup_schedule_tab()
+        # make tabs; only the first is filled in now, the others when first opened
+        self.tab_builders = {}
+        for title, builder in (("Workplace Hours", self.setup_workplace_tab),
+                               ("Import Workers", self.setup_import_tab),
+                               ("Generate Schedule", self.setup_schedule_tab)):
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=title)
+            self.tab_builders[str(frame)] = (builder, frame)
+        self.notebook.bind('<<NotebookTabChanged>>', self.build_selected_tab)
+        self.build_selected_tab()
         
         # update workplace lists
         self.load_workplaces()
 
+    def build_selected_tab(self, event=None):
+        """Fill in the selected tab the first time it is shown"""
+        builder, frame = self.tab_builders.pop(self.notebook.select(), (None, None))
+        if builder:
+            builder(frame)
+    
+    def add_workplace_dropdown(self, dropdown):
+        """Keep a workplace dropdown filled by load_workplaces"""
+        dropdown['values'] = self.workplace_names
+        self.workplace_dropdowns.append(dropdown)
+
     def ensure_database_exists(self):
-        if not os.path.exists('data'):
-            os.makedirs('data')
-            
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        
-        # make workplaces table with operating hours for each day
-        c.execute('''CREATE TABLE IF NOT EXISTS workplaces
-                    (id INTEGER PRIMARY KEY,
-                     name TEXT NOT NULL,
-                     sunday_open TEXT,
-                     sunday_close TEXT,
-                     monday_open TEXT,
-                     monday_close TEXT,
-                     tuesday_open TEXT,
-                     tuesday_close TEXT,
-                     wednesday_open TEXT,
-                     wednesday_close TEXT,
-                     thursday_open TEXT,
-                     thursday_close TEXT,
-                     friday_open TEXT,
-                     friday_close TEXT,
-                     saturday_open TEXT,
-                     saturday_close TEXT)''')
-        
-        # make workers table
-        c.execute('''CREATE TABLE IF NOT EXISTS workers
-                    (id INTEGER PRIMARY KEY,
-                     workplace_id INTEGER,
-                     first_name TEXT NOT NULL,
-                     last_name TEXT NOT NULL,
-                     email TEXT NOT NULL,
-                     work_study BOOLEAN NOT NULL,
-                     FOREIGN KEY (workplace_id) REFERENCES workplaces(id))''')
-        
-        # make availability table
-        c.execute('''CREATE TABLE IF NOT EXISTS availability
-                    (id INTEGER PRIMARY KEY,
-                     worker_id INTEGER,
-                     day TEXT NOT NULL,
-                     start_time TEXT NOT NULL,
-                     end_time TEXT NOT NULL,
-                     FOREIGN KEY (worker_id) REFERENCES workers(id))''')
-        
-        # make the shifts table
-        c.execute('''CREATE TABLE IF NOT EXISTS shifts
-                    (id INTEGER PRIMARY KEY,
-                     workplace_id INTEGER,
-                     day TEXT NOT NULL,
-                     start_time TEXT NOT NULL,
-                     end_time TEXT NOT NULL,
-                     positions INTEGER DEFAULT 1,
-                     FOREIGN KEY (workplace_id) REFERENCES workplaces(id))''')
-                     
-        conn.commit()
-        conn.close()
-        
-    def setup_workplace_tab(self):
-        workplace_frame = ttk.Frame(self.notebook)
-        self.notebook.add(workplace_frame, text="Workplace Hours")
+        migrations.migrate(self.db_file)
+        
+    def setup_status_bar(self):
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10))
+        
+        self.status_label = ttk.Label(status_frame, text="Ready")
+        self.status_label.pack(side=tk.LEFT, padx=5)
         
+        self.cancel_button = ttk.Button(status_frame, text="Cancel", 
+                                       command=self.cancel_task, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        
+        self.progress_bar = ttk.Progressbar(status_frame, length=250, mode='determinate')
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
+        
+    def run_in_background(self, title, work, on_done, on_error):
+        """Run work(progress) on a worker thread, showing progress in the status bar"""
+        if self.task and self.task.running():
+            messagebox.showerror("Error", "Another operation is still running. Wait for it or press Cancel.")
+            return
+        
+        def run(progress):
+            try:
+                with instrument.run(title) as task_run:
+                    self.task_run = task_run
+                    return work(progress)
+            finally:
+                # each worker thread gets its own connection, close it when done
+                self.db.release()
+        
+        self.task_title = title
+        self.task_run = None
+        self.task = tasks.BackgroundTask(self.root, run,
+                                         on_done=lambda result: self.end_task("finished", on_done, result),
+                                         on_error=lambda error: self.end_task("failed", on_error, error),
+                                         on_cancel=lambda: self.end_task("cancelled"),
+                                         on_progress=self.show_progress)
+        
+        self.cancel_button.config(state=tk.NORMAL)
+        self.status_label.config(text=f"{title}...")
+        self.task.start()
+    
+    def show_progress(self, progress):
+        """Update the status bar from a running task"""
+        if progress.total:
+            self.progress_bar.config(mode='determinate', maximum=progress.total, value=progress.done)
+        else:
+            self.progress_bar.config(mode='indeterminate')
+            self.progress_bar.step(5)
+        
+        text = f"{self.task_title}: {progress.message}" if progress.message else self.task_title
+        self.status_label.config(text=f"{text} ({progress.elapsed():.1f}s)")
+    
+    def end_task(self, outcome, callback=None, value=None):
+        """Reset the status bar once a task has finished, then run its callback"""
+        self.progress_bar.config(mode='determinate', value=0)
+        self.cancel_button.config(state=tk.DISABLED)
+        if outcome == "finished" and self.task_run:
+            # where the time went, e.g. "Generating schedule 1.20s: load 0.10s, assign 1.02s; ..."
+            self.status_label.config(text=self.task_run.summary())
+        else:
+            self.status_label.config(text=f"{self.task_title} {outcome} after {self.task.progress.elapsed():.1f}s")
+        
+        if callback:
+            callback(value)
+    
+    def cancel_task(self):
+        if self.task and self.task.running():
+            self.task.cancel()
+            self.status_label.config(text=f"{self.task_title}: cancelling...")
+        
+    def setup_workplace_tab(self, workplace_frame):
         # workplace name input
         ttk.Label(workplace_frame, text="Workplace Name:").grid(row=0, column=0, padx=5, pady=5, sticky='w')
         self.workplace_name = ttk.Entry(workplace_frame, width=30)
@@ -139,6 +189,7 @@ class SchedulerApp:
                                              textvariable=self.workplace_dropdown_var, 
                                              width=30)
         self.workplace_dropdown.pack(side=tk.LEFT, padx=5)
+        self.add_workplace_dropdown(self.workplace_dropdown)
         
         # shift management section
         shift_frame = ttk.LabelFrame(workplace_frame, text="Shift Management")
@@ -171,10 +222,8 @@ class SchedulerApp:
                   command=self.add_shift).grid(row=0, column=8, padx=5, pady=5)
         
         # shift list
-        self.shift_list = ttk.Treeview(shift_frame, 
-                                     columns=("id", "Day", "Start", "End", "Positions"),
-                                     show="headings",
-                                     height=10)
+        self.shift_list = VirtualTable(shift_frame, 
+                                     columns=("id", "Day", "Start", "End", "Positions"))
         self.shift_list.grid(row=1, column=0, columnspan=9, padx=5, pady=5, sticky='nsew')
         
         self.shift_list.heading("id", text="ID")
@@ -188,6 +237,21 @@ class SchedulerApp:
         ttk.Button(shift_frame, text="Delete Selected Shift", 
                   command=self.delete_shift).grid(row=2, column=0, padx=5, pady=5, sticky='w')
         
+        # per-date exceptions, using the start/end/positions above for one-off shifts
+        exception_frame = ttk.Frame(shift_frame)
+        exception_frame.grid(row=3, column=0, columnspan=9, padx=5, pady=5, sticky='w')
+        
+        ttk.Label(exception_frame, text="Date (YYYY-MM-DD):").pack(side=tk.LEFT, padx=5)
+        self.exception_date = ttk.Entry(exception_frame, width=15)
+        self.exception_date.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(exception_frame, text="Add One-off Shift", 
+                  command=lambda: self.add_exception(closed=False)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(exception_frame, text="Close Date", 
+                  command=lambda: self.add_exception(closed=True)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(exception_frame, text="Clear Date", 
+                  command=self.clear_exceptions).pack(side=tk.LEFT, padx=5)
+        
         # make frames expandable
         workplace_frame.columnconfigure(0, weight=1)
         workplace_frame.columnconfigure(1, weight=1)
@@ -198,10 +262,7 @@ class SchedulerApp:
         shift_frame.columnconfigure(8, weight=1)
         shift_frame.rowconfigure(1, weight=1)
         
-    def setup_import_tab(self):
-        import_frame = ttk.Frame(self.notebook)
-        self.notebook.add(import_frame, text="Import Workers")
-        
+    def setup_import_tab(self, import_frame):
         # control panel
         control_frame = ttk.Frame(import_frame)
         control_frame.pack(fill=tk.X, pady=10)
@@ -212,6 +273,7 @@ class SchedulerApp:
                                                     textvariable=self.import_workplace_var,
                                                     width=30)
         self.import_workplace_dropdown.pack(side=tk.LEFT, padx=5)
+        self.add_workplace_dropdown(self.import_workplace_dropdown)
         
         ttk.Button(control_frame, text="Import Excel File", 
                   command=self.import_excel).pack(side=tk.LEFT, padx=5)
@@ -224,9 +286,9 @@ class SchedulerApp:
         worker_frame.pack(fill=tk.BOTH, expand=True, pady=10)
         
         # create worker list
-        self.worker_list = ttk.Treeview(worker_frame, 
-                                      columns=("id", "Name", "Email", "Work Study", "Availability"),
-                                      show="headings")
+        # only the rows in view exist as tree items, so large rosters scroll smoothly
+        self.worker_list = VirtualTable(worker_frame, 
+                                      columns=("id", "Name", "Email", "Work Study", "Availability"))
         self.worker_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         self.worker_list.heading("id", text="ID")
@@ -241,10 +303,7 @@ class SchedulerApp:
         self.worker_list.column("Work Study", width=100)
         self.worker_list.column("Availability", width=300)
         
-    def setup_schedule_tab(self):
-        schedule_frame = ttk.Frame(self.notebook)
-        self.notebook.add(schedule_frame, text="Generate Schedule")
-        
+    def setup_schedule_tab(self, schedule_frame):
         # control panel
         control_frame = ttk.Frame(schedule_frame)
         control_frame.pack(fill=tk.X, pady=10)
@@ -255,6 +314,7 @@ class SchedulerApp:
                                                       textvariable=self.schedule_workplace_var,
                                                       width=30)
         self.schedule_workplace_dropdown.pack(side=tk.LEFT, padx=5)
+        self.add_workplace_dropdown(self.schedule_workplace_dropdown)
         
         ttk.Label(control_frame, text="Start Date (YYYY-MM-DD):").pack(side=tk.LEFT, padx=5)
         self.start_date = ttk.Entry(control_frame, width=15)
@@ -262,33 +322,40 @@ class SchedulerApp:
         # set default to current date
         self.start_date.insert(0, datetime.now().strftime("%Y-%m-%d"))
         
+        # optional: schedule (and save) every date up to this one
+        ttk.Label(control_frame, text="End Date:").pack(side=tk.LEFT, padx=5)
+        self.end_date = ttk.Entry(control_frame, width=15)
+        self.end_date.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(control_frame, text="Mode:").pack(side=tk.LEFT, padx=5)
+        self.schedule_mode_var = tk.StringVar(value='greedy')
+        ttk.Combobox(control_frame,
+                     textvariable=self.schedule_mode_var,
+                     values=engine.MODES,
+                     state='readonly',
+                     width=10).pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(control_frame, text="Generate Schedule", 
                   command=self.generate_schedule).pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(control_frame, text="Generate All", 
+                  command=self.generate_all_schedules).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(control_frame, text="Update Saved", 
+                  command=self.update_saved_schedule).pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(control_frame, text="Export Schedule", 
                   command=self.export_schedule).pack(side=tk.LEFT, padx=5)
         
-        # schedule display
-        schedule_display_frame = ttk.Frame(schedule_frame)
-        schedule_display_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        # add scrollbars
-        y_scrollbar = ttk.Scrollbar(schedule_display_frame, orient=tk.VERTICAL)
-        x_scrollbar = ttk.Scrollbar(schedule_display_frame, orient=tk.HORIZONTAL)
+        ttk.Button(control_frame, text="Export Calendars", 
+                  command=self.export_calendars).pack(side=tk.LEFT, padx=5)
         
-        self.schedule_display = ttk.Treeview(schedule_display_frame, 
+        # schedule display
+        # rows are keyed by shift time, so a new schedule only redraws the shifts that changed
+        self.schedule_display = VirtualTable(schedule_frame, 
                                            columns=("Time", "Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"),
-                                           show="headings",
-                                           yscrollcommand=y_scrollbar.set,
-                                           xscrollcommand=x_scrollbar.set)
-        
-        y_scrollbar.config(command=self.schedule_display.yview)
-        x_scrollbar.config(command=self.schedule_display.xview)
-        
-        # pack elements
-        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.schedule_display.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-        x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+                                           xscroll=True)
+        self.schedule_display.pack(fill=tk.BOTH, expand=True, pady=10)
         
         # configure treeview columns
         for col in ("Time", "Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"):
@@ -298,22 +365,12 @@ class SchedulerApp:
     def load_workplaces(self):
         """Update all workplace dropdown lists"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-            c.execute('SELECT id, name FROM workplaces')
-            workplaces = c.fetchall()
-            conn.close()
-            
-            workplace_names = [wp[1] for wp in workplaces]
-            workplace_ids = [wp[0] for wp in workplaces]
-            
-            # create mapping from name to ID
-            self.workplace_id_map = dict(zip(workplace_names, workplace_ids))
+            workplace_names = list(self.repo.workplaces())
             
-            # update all dropdowns
-            self.workplace_dropdown['values'] = workplace_names
-            self.import_workplace_dropdown['values'] = workplace_names
-            self.schedule_workplace_dropdown['values'] = workplace_names
+            # update the dropdowns of the tabs built so far (later ones start with these names)
+            self.workplace_names = workplace_names
+            for dropdown in self.workplace_dropdowns:
+                dropdown['values'] = workplace_names
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load workplaces: {str(e)}")
@@ -345,69 +402,67 @@ class SchedulerApp:
             hours_data[f"{day_lower}_close"] = close_time
         
         try:
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-            
-            # check if workplace already exists
-            c.execute('SELECT id FROM workplaces WHERE name = ?', (name,))
-            existing = c.fetchone()
-            
-            if existing:
-                # update existing workplace
-                workplace_id = existing[0]
+            with self.db.transaction() as c:
+                # check if workplace already exists
+                c.execute('SELECT id FROM workplaces WHERE name = ?', (name,))
+                existing = c.fetchone()
+            
+                if existing:
+                    # update existing workplace
+                    workplace_id = existing[0]
                 
-                update_query = '''UPDATE workplaces SET 
-                                sunday_open = ?, sunday_close = ?,
-                                monday_open = ?, monday_close = ?,
-                                tuesday_open = ?, tuesday_close = ?,
-                                wednesday_open = ?, wednesday_close = ?,
-                                thursday_open = ?, thursday_close = ?,
-                                friday_open = ?, friday_close = ?,
-                                saturday_open = ?, saturday_close = ?
-                                WHERE id = ?'''
+                    update_query = '''UPDATE workplaces SET 
+                                    sunday_open = ?, sunday_close = ?,
+                                    monday_open = ?, monday_close = ?,
+                                    tuesday_open = ?, tuesday_close = ?,
+                                    wednesday_open = ?, wednesday_close = ?,
+                                    thursday_open = ?, thursday_close = ?,
+                                    friday_open = ?, friday_close = ?,
+                                    saturday_open = ?, saturday_close = ?
+                                    WHERE id = ?'''
                 
-                c.execute(update_query, (
-                    hours_data['sunday_open'], hours_data['sunday_close'],
-                    hours_data['monday_open'], hours_data['monday_close'],
-                    hours_data['tuesday_open'], hours_data['tuesday_close'],
-                    hours_data['wednesday_open'], hours_data['wednesday_close'],
-                    hours_data['thursday_open'], hours_data['thursday_close'],
-                    hours_data['friday_open'], hours_data['friday_close'],
-                    hours_data['saturday_open'], hours_data['saturday_close'],
-                    workplace_id
-                ))
+                    c.execute(update_query, (
+                        hours_data['sunday_open'], hours_data['sunday_close'],
+                        hours_data['monday_open'], hours_data['monday_close'],
+                        hours_data['tuesday_open'], hours_data['tuesday_close'],
+                        hours_data['wednesday_open'], hours_data['wednesday_close'],
+                        hours_data['thursday_open'], hours_data['thursday_close'],
+                        hours_data['friday_open'], hours_data['friday_close'],
+                        hours_data['saturday_open'], hours_data['saturday_close'],
+                        workplace_id
+                    ))
                 
-                message = f"Workplace '{name}' updated successfully!"
+                    message = f"Workplace '{name}' updated successfully!"
                 
-            else:
-                # insert new workplace
-                insert_query = '''INSERT INTO workplaces (
-                                name, 
-                                sunday_open, sunday_close,
-                                monday_open, monday_close,
-                                tuesday_open, tuesday_close,
-                                wednesday_open, wednesday_close,
-                                thursday_open, thursday_close,
-                                friday_open, friday_close,
-                                saturday_open, saturday_close
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+                else:
+                    # insert new workplace
+                    insert_query = '''INSERT INTO workplaces (
+                                    name, 
+                                    sunday_open, sunday_close,
+                                    monday_open, monday_close,
+                                    tuesday_open, tuesday_close,
+                                    wednesday_open, wednesday_close,
+                                    thursday_open, thursday_close,
+                                    friday_open, friday_close,
+                                    saturday_open, saturday_close
+                                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
                 
-                c.execute(insert_query, (
-                    name,
-                    hours_data['sunday_open'], hours_data['sunday_close'],
-                    hours_data['monday_open'], hours_data['monday_close'],
-                    hours_data['tuesday_open'], hours_data['tuesday_close'],
-                    hours_data['wednesday_open'], hours_data['wednesday_close'],
-                    hours_data['thursday_open'], hours_data['thursday_close'],
-                    hours_data['friday_open'], hours_data['friday_close'],
-                    hours_data['saturday_open'], hours_data['saturday_close']
-                ))
+                    c.execute(insert_query, (
+                        name,
+                        hours_data['sunday_open'], hours_data['sunday_close'],
+                        hours_data['monday_open'], hours_data['monday_close'],
+                        hours_data['tuesday_open'], hours_data['tuesday_close'],
+                        hours_data['wednesday_open'], hours_data['wednesday_close'],
+                        hours_data['thursday_open'], hours_data['thursday_close'],
+                        hours_data['friday_open'], hours_data['friday_close'],
+                        hours_data['saturday_open'], hours_data['saturday_close']
+                    ))
                 
-                message = f"Workplace '{name}' added successfully!"
-            
-            conn.commit()
-            conn.close()
+                    message = f"Workplace '{name}' added successfully!"
             
+            # new hours leave the name -> ID map as it was
+            if not existing:
+                self.repo.invalidate_workplaces()
             self.load_workplaces()
             messagebox.showinfo("Success", message)
             
@@ -427,8 +482,7 @@ class SchedulerApp:
             return
             
         try:
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
+            c = self.db.cursor()
             
             # get workplace data
             c.execute('''SELECT 
@@ -442,7 +496,6 @@ class SchedulerApp:
                         FROM workplaces WHERE name = ?''', (selected_workplace,))
             
             workplace_data = c.fetchone()
-            conn.close()
             
             if not workplace_data:
                 messagebox.showerror("Error", "Workplace not found")
@@ -488,30 +541,25 @@ class SchedulerApp:
             return
             
         try:
-            # validate time format
+            # validate time format and convert to minutes since midnight
             try:
-                datetime.strptime(start_time, "%I:%M %p")
-                datetime.strptime(end_time, "%I:%M %p")
+                start_minute = time_to_minutes(start_time)
+                end_minute = time_to_minutes(end_time, end=True)
                 positions = int(positions)
             except ValueError:
                 messagebox.showerror("Error", "Invalid input format. Time must be in HH:MM AM/PM format")
                 return
                 
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
+            workplace_id = self.repo.workplace_id(workplace)
             
-            # get workplace ID
-            c.execute('SELECT id FROM workplaces WHERE name = ?', (workplace,))
-            workplace_id = c.fetchone()[0]
-            
-            # insert shift
-            c.execute('''INSERT INTO shifts 
-                        (workplace_id, day, start_time, end_time, positions)
-                        VALUES (?, ?, ?, ?, ?)''',
-                     (workplace_id, day, start_time, end_time, positions))
-            
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as c:
+                c.execute('''INSERT INTO shifts 
+                            (workplace_id, day, start_time, end_time, positions,
+                             start_minute, end_minute)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                         (workplace_id, day, start_time, end_time, positions,
+                          start_minute, end_minute))
+            self.repo.invalidate_shifts(workplace_id)
             
             # refresh shift list
             self.load_shifts()
@@ -520,6 +568,69 @@ class SchedulerApp:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to add shift: {str(e)}")
     
+    def read_exception_date(self):
+        """(workplace id, date) for the exception buttons, or None after showing an error"""
+        workplace = self.workplace_dropdown_var.get()
+        
+        if not workplace:
+            messagebox.showerror("Error", "Please select a workplace first")
+            return None
+        
+        try:
+            date = datetime.strptime(self.exception_date.get().strip(), "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
+            return None
+        
+        return self.repo.workplace_id(workplace), date
+    
+    def add_exception(self, closed):
+        """Close the workplace on a date, or add a one-off shift on it"""
+        try:
+            target = self.read_exception_date()
+            if not target:
+                return
+            workplace_id, date = target
+            
+            if closed:
+                start_minute = end_minute = None
+                positions = 0
+            else:
+                try:
+                    start_minute = time_to_minutes(self.shift_start.get())
+                    end_minute = time_to_minutes(self.shift_end.get(), end=True)
+                    positions = int(self.shift_positions.get())
+                except ValueError:
+                    messagebox.showerror("Error", "Invalid input format. Time must be in HH:MM AM/PM format")
+                    return
+            
+            with self.db.transaction() as c:
+                engine.add_exception(c, workplace_id, date, closed, start_minute, end_minute, positions)
+            
+            if closed:
+                messagebox.showinfo("Success", f"Closed on {date:%Y-%m-%d}")
+            else:
+                messagebox.showinfo("Success", f"One-off shift added on {date:%Y-%m-%d}")
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save date exception: {str(e)}")
+    
+    def clear_exceptions(self):
+        """Remove every closure and one-off shift on a date"""
+        try:
+            target = self.read_exception_date()
+            if not target:
+                return
+            workplace_id, date = target
+            
+            with self.db.transaction() as c:
+                engine.clear_exceptions(c, workplace_id, date)
+            
+            messagebox.showinfo("Success", f"Exceptions cleared for {date:%Y-%m-%d}")
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to clear date exceptions: {str(e)}")
+    
     def load_shifts(self):
         """Load shifts for the selected workplace"""
         workplace = self.workplace_dropdown_var.get()
@@ -527,60 +638,34 @@ class SchedulerApp:
         if not workplace:
             return
             
-        # clear existing shifts
-        for item in self.shift_list.get_children():
-            self.shift_list.delete(item)
-            
         try:
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-            
-            # get workplace ID
-            c.execute('SELECT id FROM workplaces WHERE name = ?', (workplace,))
-            workplace_id = c.fetchone()[0]
-            
-            # get shifts
-            c.execute('''SELECT id, day, start_time, end_time, positions
-                        FROM shifts
-                        WHERE workplace_id = ?
-                        ORDER BY CASE 
-                            WHEN day = 'Sunday' THEN 1
-                            WHEN day = 'Monday' THEN 2
-                            WHEN day = 'Tuesday' THEN 3
-                            WHEN day = 'Wednesday' THEN 4
-                            WHEN day = 'Thursday' THEN 5
-                            WHEN day = 'Friday' THEN 6
-                            WHEN day = 'Saturday' THEN 7
-                        END''', (workplace_id,))
-            
-            shifts = c.fetchall()
-            conn.close()
-            
-            # display shifts
-            for shift in shifts:
-                self.shift_list.insert('', 'end', values=shift)
+            workplace_id = self.repo.workplace_id(workplace)
+            shifts = self.repo.shifts(workplace_id)
+            
+            # display shifts, redrawing only the ones that changed
+            self.shift_list.set_rows(shifts)
                 
         except Exception as e:
+            self.shift_list.clear()
             messagebox.showerror("Error", f"Failed to load shifts: {str(e)}")
     
     def delete_shift(self):
         """Delete the selected shift"""
-        selected = self.shift_list.selection()
+        selected = self.shift_list.selected_rows()
         
         if not selected:
             messagebox.showerror("Error", "Please select a shift to delete")
             return
             
-        shift_id = self.shift_list.item(selected[0], "values")[0]
+        shift_id = selected[0][0]
         
         try:
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-            
-            c.execute('DELETE FROM shifts WHERE id = ?', (shift_id,))
-            
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as c:
+                c.execute('SELECT workplace_id FROM shifts WHERE id = ?', (shift_id,))
+                row = c.fetchone()
+                c.execute('DELETE FROM shifts WHERE id = ?', (shift_id,))
+            if row:
+                self.repo.invalidate_shifts(row[0])
             
             # refresh shift list
             self.load_shifts()
@@ -598,131 +683,57 @@ class SchedulerApp:
             return
             
         filename = filedialog.askopenfilename(
-            filetypes=[("Excel files", "*.xlsx *.xls")]
+            filetypes=[("Excel files", "*.xlsx *.xls"), ("CSV files", "*.csv")]
         )
         
         if not filename:
             return
             
+        # the saved week on the schedule tab is checked against the new availability
         try:
-            # read Excel file
-            df = pd.read_excel(filename)
-            
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-            
-            # get workplace ID
-            c.execute('SELECT id FROM workplaces WHERE name = ?', (workplace,))
-            workplace_id = c.fetchone()[0]
-            
-            # import workers and availability
-            imported_count = 0
-            for _, row in df.iterrows():
-                try:
-                    # check required columns
-                    if 'First Name' not in row or 'Last Name' not in row or 'Email' not in row:
-                        continue
-                        
-                    # get worker data
-                    first_name = row['First Name']
-                    last_name = row['Last Name']
-                    email = row['Email']
-                    
-                    # work study (default to N if not present)
-                    work_study = False
-                    if 'Work Study' in row and pd.notna(row['Work Study']):
-                        work_study = row['Work Study'].upper() == 'Y'
-                    
-                    # add worker to database
-                    c.execute('''INSERT INTO workers 
-                                (workplace_id, first_name, last_name, email, work_study)
-                                VALUES (?, ?, ?, ?, ?)''',
-                             (workplace_id, first_name, last_name, email, work_study))
-                    
-                    worker_id = c.lastrowid
-                    imported_count += 1
-                    
-                    # process availability for each day
-                    days = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
-                    for day in days:
-                        if day in row and pd.notna(row[day]) and str(row[day]).lower() != 'na':
-                            try:
-                                start_time, end_time = self.parse_time_range(str(row[day]))
-                                
-                                c.execute('''INSERT INTO availability 
-                                            (worker_id, day, start_time, end_time)
-                                            VALUES (?, ?, ?, ?)''',
-                                         (worker_id, day, start_time, end_time))
-                            except Exception as e:
-                                print(f"Error parsing time for {first_name} {last_name} on {day}: {str(e)}")
-                
-                except Exception as e:
-                    print(f"Error importing worker: {str(e)}")
-                    continue
+            check_date = datetime.strptime(self.start_date.get(), "%Y-%m-%d")
+        except (AttributeError, ValueError):
+            # schedule tab not opened yet
+            check_date = datetime.now()
+        
+        def work(progress):
+            # pandas is only loaded once something is imported
+            import importer
             
-            conn.commit()
-            conn.close()
+            conn = self.db.connection()
+            workplace_id = self.repo.workplace_id(workplace)
             
-            messagebox.showinfo("Success", f"Imported {imported_count} workers")
-            self.view_workers()
+            # the import is one transaction, rolled back on any error or Cancel, but the
+            # cached list is dropped either way
+            try:
+                # old .xls files need pandas, everything else is streamed in batches
+                if filename.lower().endswith('.xls'):
+                    report = importer.import_excel(conn, workplace_id, filename, progress=progress)
+                else:
+                    report = importer.import_stream(conn, workplace_id, filename, progress=progress)
+            finally:
+                self.repo.invalidate_workers(workplace_id)
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to import Excel file: {str(e)}")
+            try:
+                validation = validator.check_saved(conn, workplace, check_date)
+            except engine.ScheduleError:
+                validation = validator.ValidationReport()
+            return report, validation
+        
+        self.run_in_background("Importing workers", work,
+                               self.import_finished,
+                               lambda e: messagebox.showerror("Error", f"Failed to import Excel file: {str(e)}"))
     
-    def parse_time_range(self, time_str):
-        """Parse time range from format like '2 pm - 12 am' to standard 12-hour format"""
-        time_str = time_str.strip().lower()
+    def import_finished(self, result):
+        report, validation = result
         
-        # split into start and end times
-        if '-' in time_str:
-            parts = time_str.split('-')
+        if validation.ok:
+            messagebox.showinfo("Success", report.summary())
         else:
-            parts = re.split(r'\s+to\s+', time_str)
-            
-        start_part = parts[0].strip()
-        end_part = parts[1].strip()
-        
-        # parse start time
-        start_match = re.search(r'(\d+)(?::(\d+))?\s*(am|pm)', start_part)
-        if not start_match:
-            # try without am/pm
-            start_match = re.search(r'(\d+)(?::(\d+))?', start_part)
-            if start_match:
-                hour = int(start_match.group(1))
-                minute = start_match.group(2) or "00"
-                ampm = "am" if hour < 12 else "pm"
-                start_time = f"{hour}:{minute} {ampm}"
-            else:
-                raise ValueError(f"Cannot parse start time: {start_part}")
-        else:
-            hour = int(start_match.group(1))
-            minute = start_match.group(2) or "00"
-            ampm = start_match.group(3)
-            start_time = f"{hour}:{minute} {ampm}"
-        
-        # parse end time
-        end_match = re.search(r'(\d+)(?::(\d+))?\s*(am|pm)', end_part)
-        if not end_match:
-            # try without am/pm
-            end_match = re.search(r'(\d+)(?::(\d+))?', end_part)
-            if end_match:
-                hour = int(end_match.group(1))
-                minute = end_match.group(2) or "00"
-                ampm = "am" if hour < 12 else "pm"
-                end_time = f"{hour}:{minute} {ampm}"
-            else:
-                raise ValueError(f"Cannot parse end time: {end_part}")
-        else:
-            hour = int(end_match.group(1))
-            minute = end_match.group(2) or "00"
-            ampm = end_match.group(3)
-            end_time = f"{hour}:{minute} {ampm}"
-        
-        # standardize format
-        start_dt = datetime.strptime(start_time, "%I:%M %p")
-        end_dt = datetime.strptime(end_time, "%I:%M %p")
-        
-        return start_dt.strftime("%I:%M %p"), end_dt.strftime("%I:%M %p")
+            messagebox.showwarning("Schedule Problems",
+                                   report.summary() + "\n\nThe saved schedule now has problems:\n"
+                                   + validation.summary(limit=5))
+        self.view_workers()
     
     def view_workers(self):
         """Display workers for the selected workplace"""
@@ -732,59 +743,24 @@ class SchedulerApp:
             messagebox.showerror("Error", "Please select a workplace first")
             return
             
-        # clear current worker list
-        for item in self.worker_list.get_children():
-            self.worker_list.delete(item)
-            
-        try:
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-            
-            # get workplace ID
-            c.execute('SELECT id FROM workplaces WHERE name = ?', (workplace,))
-            workplace_id = c.fetchone()[0]
-            
-            # get workers
-            c.execute('''SELECT w.id, w.first_name, w.last_name, w.email, w.work_study
-                        FROM workers w
-                        WHERE w.workplace_id = ?''', (workplace_id,))
-            
-            workers = c.fetchall()
-            
-            # for each worker, get their availability
-            for worker in workers:
-                worker_id, first_name, last_name, email, work_study = worker
-                
-                c.execute('''SELECT day, start_time, end_time
-                            FROM availability
-                            WHERE worker_id = ?
-                            ORDER BY CASE 
-                                WHEN day = 'Sunday' THEN 1
-                                WHEN day = 'Monday' THEN 2
-                                WHEN day = 'Tuesday' THEN 3
-                                WHEN day = 'Wednesday' THEN 4
-                                WHEN day = 'Thursday' THEN 5
-                                WHEN day = 'Friday' THEN 6
-                                WHEN day = 'Saturday' THEN 7
-                            END''', (worker_id,))
-                
-                availability = c.fetchall()
-                
-                # format availability for display
-                avail_str = ", ".join([f"{day}: {start}-{end}" for day, start, end in availability])
+        with instrument.run("Viewing workers", workplace=workplace) as run:
+            try:
+                with instrument.span('query'):
+                    workplace_id = self.repo.workplace_id(workplace)
+                    workers = [(worker_id, name, email, "Yes" if work_study else "No", avail_str)
+                               for worker_id, name, email, work_study, avail_str
+                               in self.repo.workers(workplace_id)]
                 
-                # add to worker list
-                self.worker_list.insert('', 'end', 
-                                      values=(worker_id, 
-                                            f"{first_name} {last_name}", 
-                                            email, 
-                                            "Yes" if work_study else "No",
-                                            avail_str))
-            
-            conn.close()
+            except Exception as e:
+                self.worker_list.clear()
+                messagebox.showerror("Error", f"Failed to load workers: {str(e)}")
+                return
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load workers: {str(e)}")
+            instrument.count('workers shown', len(workers))
+            with instrument.span('show'):
+                self.worker_list.set_rows(workers)
+        
+        self.status_label.config(text=run.summary())
     
     def generate_schedule(self):
         """Generate a weekly work schedule"""
@@ -794,202 +770,222 @@ class SchedulerApp:
             messagebox.showerror("Error", "Please select a workplace")
             return
             
+        dates = self.read_date_range()
+        if not dates:
+            return
+        start_date, end_date = dates
+        
+        mode = self.schedule_mode_var.get()
+        
+        # without an end date one week is generated
+        if end_date is None:
+            end_date = start_date + timedelta(days=6)
+        
+        def work(progress):
+            conn = self.db.connection()
+            days = engine.generate_range(conn, workplace, start_date, end_date,
+                                         save=True, mode=mode, progress=progress)
+            with instrument.span('validate'):
+                return days, validator.check(conn, workplace, days)
+        
+        self.run_in_background("Generating schedule", work,
+                               self.schedule_generated, self.schedule_failed)
+    
+    def update_saved_schedule(self):
+        """Bring the saved schedule up to date, changing as few assignments as possible"""
+        workplace = self.schedule_workplace_var.get()
+        
+        if not workplace:
+            messagebox.showerror("Error", "Please select a workplace")
+            return
+        
+        dates = self.read_date_range()
+        if not dates:
+            return
+        start_date, end_date = dates
+        
+        # open positions are filled by the rules of the selected mode
+        mode = self.schedule_mode_var.get()
+        
+        def work(progress):
+            return incremental.reschedule(self.db.connection(), workplace, start_date, end_date,
+                                          mode=mode, progress=progress)
+        
+        self.run_in_background("Updating schedule", work,
+                               self.schedule_updated, self.schedule_failed)
+    
+    def schedule_updated(self, result):
+        self.shown_schedules = {self.schedule_workplace_var.get(): result.days}
+        self.display_schedule(engine.week_grid(result.days[:7]))
+        
+        if not result.added and not result.removed:
+            messagebox.showinfo("Success", "The saved schedule is already up to date.")
+            return
+        
+        # the full list can be long, show the first changes
+        lines = [f"- {incremental.describe(change)}" for change in result.removed]
+        lines += [f"+ {incremental.describe(change)}" for change in result.added]
+        if len(lines) > 20:
+            lines = lines[:20] + [f"... and {len(lines) - 20} more"]
+        
+        messagebox.showinfo("Success", f"{len(result.removed)} assignments removed, "
+                                       f"{len(result.added)} added:\n\n" + "\n".join(lines))
+    
+    def read_date_range(self):
+        """(start date, end date or None) from the entries, or None after showing an error"""
         try:
-            # get start date
-            start_date_str = self.start_date.get()
-            try:
-                start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-            except ValueError:
-                messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
-                return
-                
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-            
-            # get workplace ID and operating hours
-            c.execute('SELECT id FROM workplaces WHERE name = ?', (workplace,))
-            workplace_id = c.fetchone()[0]
-            
-            # get shifts for this workplace
-            c.execute('''SELECT day, start_time, end_time, positions
-                        FROM shifts
-                        WHERE workplace_id = ?''', (workplace_id,))
-            
-            shifts_data = c.fetchall()
-            
-            if not shifts_data:
-                messagebox.showerror("Error", "No shifts defined for this workplace. Please add shifts in the Workplace Hours tab.")
-                conn.close()
-                return
-                
-            # get workers and their availability
-            c.execute('''SELECT w.id, w.first_name, w.last_name, w.work_study,
-                               a.day, a.start_time, a.end_time
-                        FROM workers w
-                        JOIN availability a ON w.id = a.worker_id
-                        WHERE w.workplace_id = ?''', (workplace_id,))
-                        
-            availability_data = c.fetchall()
-            
-            conn.close()
-            
-            if not availability_data:
-                messagebox.showerror("Error", "No workers with availability found")
-                return
-                
-            # generate schedule
-            schedule = self.create_schedule(shifts_data, availability_data, start_date)
-            
-            # display schedule
-            self.display_schedule(schedule)
-            
-            messagebox.showinfo("Success", "Schedule generated successfully!")
+            start_date = datetime.strptime(self.start_date.get(), "%Y-%m-%d")
+            end_date_str = self.end_date.get().strip()
+            end_date = datetime.strptime(end_date_str, "%Y-%m-%d") if end_date_str else None
+        except ValueError:
+            messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD")
+            return None
+        
+        if end_date and end_date < start_date:
+            messagebox.showerror("Error", "End date is before the start date")
+            return None
+        
+        return start_date, end_date
+    
+    def generate_all_schedules(self):
+        """Generate and save the week for every workplace in parallel"""
+        workplaces = list(self.schedule_workplace_dropdown['values'])
+        if not workplaces:
+            messagebox.showerror("Error", "No workplaces to schedule")
+            return
+        
+        dates = self.read_date_range()
+        if not dates:
+            return
+        start_date, end_date = dates
+        
+        mode = self.schedule_mode_var.get()
+        
+        def work(progress):
+            # multiprocessing is only loaded when a batch is run
+            import batch
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate schedule: {str(e)}")
+            return batch.generate_many(self.db_file, workplaces, start_date, end_date, save=True,
+                                       progress=progress, mode=mode)
+        
+        self.run_in_background("Generating all schedules", work,
+                               self.all_schedules_generated, self.schedule_failed)
     
-    def create_schedule(self, shifts_data, availability_data, start_date):
-        """Create a weekly schedule based on shifts and worker availability"""
-        # map of day names to day numbers (0=Monday in datetime, but we want Sunday=0)
-        day_to_num = {
-            'Sunday': 6,
-            'Monday': 0,
-            'Tuesday': 1,
-            'Wednesday': 2,
-            'Thursday': 3,
-            'Friday': 4,
-            'Saturday': 5
-        }
-        
-        num_to_day = {v: k for k, v in day_to_num.items()}
-        
-        # group shifts by day
-        shifts_by_day = {}
-        for day, start, end, positions in shifts_data:
-            if day not in shifts_by_day:
-                shifts_by_day[day] = []
-            shifts_by_day[day].append((start, end, positions))
-        
-        # group worker availability by day
-        workers_by_day = {}
-        for worker_id, fname, lname, work_study, day, start, end in availability_data:
-            if day not in workers_by_day:
-                workers_by_day[day] = []
-                
-            workers_by_day[day].append({
-                'id': worker_id,
-                'name': f"{fname} {lname}",
-                'work_study': work_study,
-                'start': start,
-                'end': end
-            })
-        
-        # create empty schedule organized by shift time
-        schedule = {}
-        
-        # for each shift
-        for day, shifts in shifts_by_day.items():
-            # for each shift on this day
-            for shift_start, shift_end, positions in shifts:
-                shift_key = f"{shift_start} - {shift_end}"
-                
-                if shift_key not in schedule:
-                    schedule[shift_key] = {d: [] for d in ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']}
-                
-                # find available workers for this shift
-                if day in workers_by_day:
-                    available_workers = []
-                    
-                    for worker in workers_by_day[day]:
-                        # check if worker is available for this shift
-                        worker_start = self.time_to_datetime(worker['start'])
-                        worker_end = self.time_to_datetime(worker['end'])
-                        
-                        shift_start_dt = self.time_to_datetime(shift_start)
-                        shift_end_dt = self.time_to_datetime(shift_end)
-                        
-                        # worker is available if their time covers the shift
-                        if worker_start <= shift_start_dt and worker_end >= shift_end_dt:
-                            available_workers.append(worker)
-                    
-                    # prioritize work study students
-                    available_workers.sort(key=lambda w: (w['work_study'], w['name']), reverse=True)
-                    
-                    # assign workers to positions
-                    assigned_workers = available_workers[:positions]
-                    schedule[shift_key][day] = [w['name'] for w in assigned_workers]
-        
-        return schedule
+    def all_schedules_generated(self, result):
+        schedules, errors, reports = result
+        self.shown_schedules = schedules
+        
+        # show the selected workplace's schedule if it was part of the run
+        workplace = self.schedule_workplace_var.get()
+        if workplace in schedules:
+            self.display_schedule(engine.week_grid(schedules[workplace][:7]))
+        
+        message = f"Generated and saved schedules for {len(schedules)} workplaces."
+        if errors:
+            message += "\n\nNot scheduled:\n" + "\n".join(f"{name}: {error}" for name, error in errors.items())
+        
+        problems = [f"{name}: " + ", ".join(f"{count} {kind}" for kind, count in report.counts().items() if count)
+                    for name, report in reports.items() if not report.ok]
+        if problems:
+            message += "\n\nProblems found:\n" + "\n".join(problems)
+        messagebox.showinfo("Success", message)
     
-    def time_to_datetime(self, time_str):
-        """Convert time string to datetime object"""
-        return datetime.strptime(time_str, "%I:%M %p")
+    def schedule_generated(self, result):
+        days, report = result
+        self.shown_schedules = {self.schedule_workplace_var.get(): days}
+        self.display_schedule(engine.week_grid(days[:7]))
+        
+        if len(days) > 7:
+            message = (f"Schedule generated and saved for {len(days)} days "
+                       f"({days[0].date} to {days[-1].date}). The first week is shown.")
+        else:
+            message = "Schedule generated and saved successfully!"
+        
+        if report.ok:
+            messagebox.showinfo("Success", message)
+        else:
+            messagebox.showwarning("Schedule Problems", message + "\n\n" + report.summary(limit=5))
+    
+    def schedule_failed(self, error):
+        if isinstance(error, engine.ScheduleError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Failed to generate schedule: {str(error)}")
     
     def display_schedule(self, schedule):
         """Display the generated schedule"""
-        # clear existing items
-        for item in self.schedule_display.get_children():
-            self.schedule_display.delete(item)
-            
-        # sort shifts by start time
-        def get_start_time(shift_key):
-            start_time = shift_key.split(' - ')[0]
-            return self.time_to_datetime(start_time)
-            
-        sorted_shifts = sorted(schedule.keys(), key=get_start_time)
-        
-        days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        
-        # add rows for each shift
-        for shift in sorted_shifts:
-            row_data = [shift]
-            
-            for day in days:
-                workers = schedule[shift][day]
-                if workers:
-                    row_data.append('\n'.join(workers))
-                else:
-                    row_data.append('')
-            
-            self.schedule_display.insert('', 'end', values=tuple(row_data))
+        with instrument.run("Displaying schedule") as display_run:
+            # a row for each shift, sorted by start time
+            with instrument.span('rows'):
+                rows = engine.schedule_rows(schedule)
+            with instrument.span('show'):
+                self.schedule_display.set_rows(rows)
+            instrument.count('rows', len(rows))
+        
+        # keep the task's summary in the status bar and add the display time to it
+        if self.task_run:
+            self.status_label.config(text=f"{self.task_run.summary()}; shown in {display_run.seconds:.2f}s")
     
     def export_schedule(self):
-        """Export the schedule to Excel"""
-        if not self.schedule_display.get_children():
-            messagebox.showerror("Error", "No schedule to export. Please generate a schedule first.")
-            return
-            
+        """Export the shown schedules to Excel, CSV or JSON Lines"""
         filename = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx")]
+            filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("JSON Lines", "*.jsonl")]
         )
         
-        if not filename:
-            return
+        if filename:
+            self.export_to(filename)
+    
+    def export_calendars(self):
+        """Write a calendar feed per worker into a folder, rewriting only the changed ones"""
+        folder = filedialog.askdirectory(title="Folder for the calendar feeds")
+        
+        if folder:
+            self.export_to(folder, 'ics')
+    
+    def export_to(self, target, format=None):
+        """Export the shown schedules, or the saved ones if nothing was generated yet"""
+        schedules = self.shown_schedules
+        if not schedules:
+            workplace = self.schedule_workplace_var.get()
+            if not workplace:
+                messagebox.showerror("Error", "Please select a workplace")
+                return
             
+            dates = self.read_date_range()
+            if not dates:
+                return
+            start_date, end_date = dates
+        
         try:
-            # create dataFrame from treeview
-            data = []
-            columns = ["Time", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
-            
-            for item_id in self.schedule_display.get_children():
-                values = self.schedule_display.item(item_id, 'values')
-                data.append(values)
-            
-            df = pd.DataFrame(data, columns=columns)
-            
-            # export to excel
-            df.to_excel(filename, index=False)
-            
-            messagebox.showinfo("Success", f"Schedule exported to {filename}")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export schedule: {str(e)}")
+            format = exporter.format_of(target, format)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        def work(progress):
+            if schedules:
+                return exporter.export(target, schedules, progress=progress, format=format)
+            saved = exporter.saved_schedules(self.db.connection(), [workplace], start_date, end_date)
+            return exporter.export(target, saved, progress=progress, format=format)
+        
+        self.run_in_background("Exporting schedule", work,
+                               lambda written: self.schedule_exported(format, written),
+                               lambda e: messagebox.showerror("Error", f"Failed to export schedule: {str(e)}"))
+    
+    def schedule_exported(self, format, written):
+        if written or format == 'ics':
+            messagebox.showinfo("Success", f"Schedule exported ({written} {exporter.UNITS[format]} written)")
+        else:
+            messagebox.showerror("Error", "No saved schedule in that range. Please generate a schedule first.")
 
 def main():
+    # SCHEDULER_METRICS_LOG=file logs every run, SCHEDULER_PROFILE=file profiles the first
+    instrument.configure_from_env()
     root = tk.Tk()
     app = SchedulerApp(root)
     root.mainloop()
+    app.db.close()
 
 if __name__ == "__main__":
     main()
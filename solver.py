@@ -0,0 +1,415 @@
+"""High-coverage shift assignment by min-cost max-flow
+
+The network for one week is:
+
+    source -> shift (capacity = positions)
+           -> worker's overlap group for that day (capacity 1, cost = priority)
+           -> worker (capacity 1 per group)
+           -> sink (capacity = weekly shift cap)
+
+A worker's eligible shifts on one day are split into groups of shifts
+that overlap each other, and each group can be used once, so nobody is
+booked twice at the same time. The flow is pushed to its maximum
+first, so coverage is never traded for priority, and among maximum
+assignments the cheapest one wins, i.e. the one using the most work
+study students.
+
+Overlap is grouped transitively: chained handover shifts (8-12, 11-3,
+2-6, 5-9) form one group, so the flow alone gives a worker only one of
+them although 8-12 and 2-6 could both be worked. Three passes make up
+for it:
+
+- fill_gaps gives the positions still open to workers who are free at
+  that time, the same way greedy ranks them
+- if positions are still open, greedy without double-booking (fill_gaps
+  from nothing, earliest ending shift first) is tried as well and kept
+  when it fills more
+- augment fills more by moving up to AUGMENT_DEPTH assignments along a
+  chain (Ann takes the open shift, her clashing shift goes to Ben, ...)
+
+Packing shifts exactly per time point is not a flow problem (with
+eligibility it is NP-hard), so the result is never below that greedy
+and usually the maximum, but not a proven maximum.
+"""
+import heapq
+
+from interval_index import build_day_indexes
+
+# edge costs, lower is preferred
+WORK_STUDY_COST = 0
+REGULAR_COST = 1
+
+INF = float('inf')
+
+# assignments one augment chain may move, and candidates it may try per open position
+AUGMENT_DEPTH = 3
+AUGMENT_STEPS = 2000
+
+
+class MinCostFlow:
+    """Min-cost max-flow by the primal-dual method
+
+    Each round runs Dijkstra with potentials to find shortest path
+    distances, then sends a blocking flow through every edge whose
+    reduced cost is zero (Dinic-style) before the next round. With the
+    small integer costs used here only a handful of rounds are needed,
+    which keeps it fast on graphs with hundreds of thousands of edges.
+    """
+
+    def __init__(self, node_count):
+        self.node_count = node_count
+        self.adj = [[] for _ in range(node_count)]
+        # edge e and its reverse e ^ 1 are stored side by side
+        self.to = []
+        self.cap = []
+        self.cost = []
+
+    def add_edge(self, u, v, cap, cost):
+        """Add an edge u -> v and return its index (its flow is flow_on(index))"""
+        index = len(self.to)
+        self.to.extend((v, u))
+        self.cap.extend((cap, 0))
+        self.cost.extend((cost, -cost))
+        self.adj[u].append(index)
+        self.adj[v].append(index + 1)
+        return index
+
+    def flow_on(self, index):
+        """Flow currently sent along the edge returned by add_edge"""
+        return self.cap[index + 1]
+
+    def _distances(self, source, potential):
+        """Dijkstra over residual edges using reduced costs"""
+        to, cap, cost, adj = self.to, self.cap, self.cost, self.adj
+        dist = [INF] * self.node_count
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            pu = potential[u]
+            for e in adj[u]:
+                if cap[e] > 0:
+                    v = to[e]
+                    nd = d + cost[e] + pu - potential[v]
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+        return dist
+
+    def _blocking_flow(self, source, sink, potential, check=None):
+        """Push as much flow as possible through zero reduced cost edges"""
+        to, cap, cost, adj = self.to, self.cap, self.cost, self.adj
+        pushed = 0
+
+        while True:
+            if check:
+                check()
+            # level graph over admissible edges
+            level = [-1] * self.node_count
+            level[source] = 0
+            queue = [source]
+            for u in queue:
+                for e in adj[u]:
+                    v = to[e]
+                    if cap[e] > 0 and level[v] < 0 and cost[e] + potential[u] - potential[v] == 0:
+                        level[v] = level[u] + 1
+                        queue.append(v)
+            if level[sink] < 0:
+                return pushed
+
+            # augment one path at a time with an iterative DFS
+            pointer = [0] * self.node_count
+            while True:
+                path = []
+                u = source
+                while u != sink:
+                    edges = adj[u]
+                    while pointer[u] < len(edges):
+                        e = edges[pointer[u]]
+                        v = to[e]
+                        if (cap[e] > 0 and level[v] == level[u] + 1
+                                and cost[e] + potential[u] - potential[v] == 0):
+                            break
+                        pointer[u] += 1
+                    else:
+                        # dead end, back up and skip the edge that led here
+                        if not path:
+                            break
+                        level[u] = -1
+                        e = path.pop()
+                        u = to[e ^ 1]
+                        pointer[u] += 1
+                        continue
+                    path.append(e)
+                    u = v
+                if u != sink:
+                    break
+
+                amount = min(cap[e] for e in path)
+                for e in path:
+                    cap[e] -= amount
+                    cap[e ^ 1] += amount
+                pushed += amount
+
+    def solve(self, source, sink, check=None):
+        """Send the maximum flow at minimum cost, returning (flow, cost)
+
+        check, if given, is called between rounds and may raise to stop.
+        """
+        potential = [0] * self.node_count
+        total = 0
+
+        while True:
+            if check:
+                check()
+            dist = self._distances(source, potential)
+            if dist[sink] == INF:
+                break
+            limit = dist[sink]
+            for v in range(self.node_count):
+                potential[v] += min(dist[v], limit)
+            total += self._blocking_flow(source, sink, potential, check)
+
+        total_cost = sum(self.cost[e] * self.cap[e + 1] for e in range(0, len(self.to), 2))
+        return total, total_cost
+
+
+def overlap_groups(shifts):
+    """Split (start, end, key) shifts into groups that overlap one another"""
+    groups = []
+    group_end = None
+    for start, end, key in sorted(shifts):
+        if group_end is None or start >= group_end:
+            groups.append([])
+            group_end = end
+        else:
+            group_end = max(group_end, end)
+        groups[-1].append(key)
+    return groups
+
+
+def assign_optimal(shifts_data, availability_data, max_shifts=None, check=None):
+    """Assign workers to shifts maximizing coverage, work study students first
+
+    Takes the same rows as engine.assign_shifts and returns a list of
+    (shift index, worker id, name) tuples. max_shifts caps how many
+    shifts one worker gets in the week. check, if given, is called
+    between steps of the solve and may raise (tasks.Cancelled) to stop.
+    """
+    windows_by_day = {}
+    workers = {}
+    for worker_id, fname, lname, work_study, day, start, end in availability_data:
+        windows_by_day.setdefault(day, []).append((start, end, worker_id))
+        workers[worker_id] = (f"{fname} {lname}", work_study)
+
+    indexes = build_day_indexes(windows_by_day)
+
+    # eligible shifts per worker and day
+    eligible = {}
+    for i, (day, start, end, positions) in enumerate(shifts_data):
+        if check:
+            check()
+        if day not in indexes or positions <= 0:
+            continue
+        for worker_id in indexes[day].covering(start, end):
+            eligible.setdefault((worker_id, day), []).append((start, end, i))
+
+    # node numbering: source, sink, shifts, workers, then overlap groups
+    source, sink = 0, 1
+    shift_base = 2
+    worker_node = {}
+    for worker_id in sorted(workers):
+        worker_node[worker_id] = shift_base + len(shifts_data) + len(worker_node)
+    group_base = shift_base + len(shifts_data) + len(worker_node)
+
+    group_count = 0
+    group_edges = []
+    for (worker_id, day), shifts in eligible.items():
+        if check:
+            check()
+        # a worker with two windows covering the same shift is listed once
+        for group in overlap_groups(set(shifts)):
+            group_edges.append((group_base + group_count, worker_id, group))
+            group_count += 1
+
+    graph = MinCostFlow(group_base + group_count)
+
+    for i, (day, start, end, positions) in enumerate(shifts_data):
+        if positions > 0:
+            graph.add_edge(source, shift_base + i, positions, 0)
+
+    assignment_edges = []
+    for node, worker_id, group in group_edges:
+        if check:
+            check()
+        name, work_study = workers[worker_id]
+        cost = WORK_STUDY_COST if work_study else REGULAR_COST
+        for i in group:
+            assignment_edges.append((graph.add_edge(shift_base + i, node, 1, cost), i, worker_id))
+        graph.add_edge(node, worker_node[worker_id], 1, 0)
+
+    for worker_id, node in worker_node.items():
+        capacity = max_shifts if max_shifts is not None else len(shifts_data)
+        graph.add_edge(node, sink, capacity, 0)
+
+    graph.solve(source, sink, check)
+
+    picks = [(i, worker_id, workers[worker_id][0])
+             for edge, i, worker_id in assignment_edges
+             if graph.flow_on(edge)]
+    picks = picks + fill_gaps(shifts_data, indexes, workers, picks, max_shifts)
+    if len(picks) == sum(max(positions, 0) for day, start, end, positions in shifts_data):
+        return picks
+
+    # long chains of handovers can leave the flow well short; greedy by earliest end,
+    # which packs intervals well, may then do better
+    by_end = sorted(range(len(shifts_data)), key=lambda i: (shifts_data[i][2], shifts_data[i][1]))
+    baseline = sorted(fill_gaps(shifts_data, indexes, workers, [], max_shifts, by_end))
+    if len(baseline) > len(picks):
+        picks = baseline
+    return augment(shifts_data, indexes, workers, picks, max_shifts)
+
+
+def fill_gaps(shifts_data, indexes, workers, picks, max_shifts=None, order=None):
+    """Extra (shift index, worker id, name) picks for positions picks left open
+
+    A worker is only added to a shift that overlaps none of their shifts
+    that day and while under max_shifts; work study students first, then
+    by name, as in greedy. Shifts are filled in the order of the indexes
+    in order, by default as listed.
+    """
+    filled = [0] * len(shifts_data)
+    booked = {}
+    taken = {}
+    for i, worker_id, name in picks:
+        day, start, end, positions = shifts_data[i]
+        filled[i] += 1
+        booked.setdefault((worker_id, day), []).append((start, end))
+        taken[worker_id] = taken.get(worker_id, 0) + 1
+
+    def rank(worker_id):
+        name, work_study = workers[worker_id]
+        return work_study, name
+
+    extra = []
+    for i in range(len(shifts_data)) if order is None else order:
+        day, start, end, positions = shifts_data[i]
+        if filled[i] >= positions or day not in indexes:
+            continue
+        for worker_id in sorted(sorted(set(indexes[day].covering(start, end))), key=rank, reverse=True):
+            if max_shifts is not None and taken.get(worker_id, 0) >= max_shifts:
+                continue
+            busy = booked.setdefault((worker_id, day), [])
+            if any(start < busy_end and busy_start < end for busy_start, busy_end in busy):
+                continue
+            busy.append((start, end))
+            taken[worker_id] = taken.get(worker_id, 0) + 1
+            extra.append((i, worker_id, workers[worker_id][0]))
+            filled[i] += 1
+            if filled[i] == positions:
+                break
+
+    return extra
+
+
+def augment(shifts_data, indexes, workers, picks, max_shifts=None,
+            depth=AUGMENT_DEPTH, steps=AUGMENT_STEPS):
+    """picks with more positions filled by moving other picks along a chain
+
+    For an open position a worker who could take it but clashes with one
+    of their shifts takes it anyway if that shift can in turn be refilled,
+    up to depth moves, or if the time it frees lets someone take another
+    open shift then. Returns picks itself when nothing could be filled.
+    """
+    on = [set() for _ in shifts_data]
+    booked = {}
+    taken = {}
+
+    def add(i, worker_id):
+        on[i].add(worker_id)
+        booked.setdefault((worker_id, shifts_data[i][0]), set()).add(i)
+        taken[worker_id] = taken.get(worker_id, 0) + 1
+
+    def remove(i, worker_id):
+        on[i].discard(worker_id)
+        booked[(worker_id, shifts_data[i][0])].discard(i)
+        taken[worker_id] -= 1
+
+    for i, worker_id, name in picks:
+        add(i, worker_id)
+
+    def rank(worker_id):
+        name, work_study = workers[worker_id]
+        return work_study, name
+
+    same_day = {}
+    for i, (day, start, end, positions) in enumerate(shifts_data):
+        same_day.setdefault(day, []).append(i)
+
+    def overlapping(j):
+        day, start, end, positions = shifts_data[j]
+        return [k for k in same_day[day]
+                if start < shifts_data[k][2] and shifts_data[k][1] < end]
+
+    eligible = {}
+
+    def candidates(i):
+        if i not in eligible:
+            day, start, end, positions = shifts_data[i]
+            eligible[i] = sorted(sorted(set(indexes[day].covering(start, end))), key=rank, reverse=True)
+        return eligible[i]
+
+    left = 0
+
+    def fill(i, moves, chain):
+        """Put one more worker on shift i, moving at most moves other picks"""
+        nonlocal left
+        day, start, end, positions = shifts_data[i]
+        for worker_id in candidates(i):
+            if worker_id in on[i]:
+                continue
+            left -= 1
+            if left < 0:
+                return False
+
+            clash = [j for j in booked.get((worker_id, day), ())
+                     if start < shifts_data[j][2] and shifts_data[j][1] < end]
+            if len(clash) > 1:
+                continue
+            if max_shifts is not None and taken.get(worker_id, 0) - len(clash) >= max_shifts:
+                continue
+            if not clash:
+                add(i, worker_id)
+                return True
+
+            j = clash[0]
+            if not moves or j in chain:
+                continue
+            remove(j, worker_id)
+            add(i, worker_id)
+            if fill(j, moves - 1, chain | {j}):
+                return True
+            # j stays short, but the time it frees may fill another open shift
+            for k in overlapping(j):
+                if k not in chain and len(on[k]) < shifts_data[k][3] and fill(k, 0, chain):
+                    return True
+            remove(i, worker_id)
+            add(j, worker_id)
+        return False
+
+    changed = False
+    for i, (day, start, end, positions) in enumerate(shifts_data):
+        if day not in indexes:
+            continue
+        while len(on[i]) < positions:
+            left = steps
+            if not fill(i, depth, {i}):
+                break
+            changed = True
+
+    if not changed:
+        return picks
+    return [(i, worker_id, workers[worker_id][0])
+            for i in range(len(shifts_data)) for worker_id in sorted(on[i])]
@@ -0,0 +1,188 @@
+"""Seeded synthetic workplaces, shifts and rosters for benchmarks and demos
+
+The same seed always gives the same data, so runs of benchmark.py are
+comparable between versions. Availability is written the way people
+type it into roster spreadsheets ('2 pm - 12 am', '9am-5pm',
+'10:30 am to 4 pm', 'NA', the odd unreadable entry).
+
+    python -m synthetic roster.xlsx --workers 10000
+    python -m synthetic --db data/demo.db --workers 1000 --workplaces 3
+"""
+import argparse
+import csv
+import random
+import sqlite3
+import sys
+
+import engine
+import migrations
+from timeparse import TIME_LABELS, parse_range_minutes
+
+FIRST_NAMES = ["Ava", "Ben", "Chloe", "Diego", "Emma", "Farah", "Gus", "Hana", "Ivan", "Jada",
+               "Kai", "Lena", "Milo", "Nora", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tariq",
+               "Uma", "Vik", "Wren", "Xia", "Yusuf", "Zoe"]
+LAST_NAMES = ["Adams", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes", "Ito",
+              "Jones", "Khan", "Lopez", "Murphy", "Nguyen", "Okafor", "Patel", "Quist", "Rossi",
+              "Smith", "Tanaka", "Usman", "Varga", "Wilson", "Young", "Zhang"]
+
+ROSTER_COLUMNS = ['First Name', 'Last Name', 'Email', 'Work Study'] + engine.DAYS
+
+# share of day cells that are empty, 'NA' or unreadable
+EMPTY_RATE = 0.35
+NA_RATE = 0.05
+JUNK_RATE = 0.01
+JUNK = ["whenever", "ask me", "mornings?", "9 till late", "tbd"]
+
+
+def _clock(minutes, rng):
+    """One side of a range in a random but readable style"""
+    hour = (minutes // 60) % 24
+    minute = minutes % 60
+    ampm = "am" if hour < 12 else "pm"
+    hour12 = (hour + 11) % 12 + 1
+    if minute:
+        return f"{hour12}:{minute:02d} {ampm}"
+    return rng.choice([f"{hour12} {ampm}", f"{hour12}{ampm}", f"{hour12}:00 {ampm}"])
+
+
+def availability_string(rng):
+    """A random availability cell, e.g. '2 pm - 12 am'"""
+    roll = rng.random()
+    if roll < EMPTY_RATE:
+        return None
+    if roll < EMPTY_RATE + NA_RATE:
+        return "NA"
+    if roll < EMPTY_RATE + NA_RATE + JUNK_RATE:
+        return rng.choice(JUNK)
+
+    # half hours from 6 AM, two to ten hours long, ending by midnight
+    start = rng.randrange(12, 40) * 30
+    end = min(start + rng.randrange(4, 21) * 30, 24 * 60)
+    separator = rng.choice([" - ", "-", " to "])
+    return f"{_clock(start, rng)}{separator}{_clock(end, rng)}"
+
+
+def roster_rows(count, seed=0):
+    """Yield count roster rows as lists in ROSTER_COLUMNS order"""
+    rng = random.Random(seed)
+    for n in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        work_study = "Y" if rng.random() < 0.3 else "N"
+        days = [availability_string(rng) for day in engine.DAYS]
+        yield [first, last, f"{first.lower()}.{last.lower()}.{n}@example.edu", work_study] + days
+
+
+def write_roster(filename, count, seed=0):
+    """Write a roster workbook (.xlsx, streamed with openpyxl) or .csv of count workers"""
+    if filename.lower().endswith('.csv'):
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(ROSTER_COLUMNS)
+            for row in roster_rows(count, seed):
+                writer.writerow(['' if value is None else value for value in row])
+        return
+
+    from openpyxl import Workbook
+
+    # write-only mode keeps memory flat at any size
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Roster")
+    sheet.append(ROSTER_COLUMNS)
+    for row in roster_rows(count, seed):
+        sheet.append(row)
+    workbook.save(filename)
+
+
+def shift_rows(workers, rng):
+    """(day, start, end, positions) shifts sized so workers can roughly fill them"""
+    per_day = max(2, workers // 40)
+    shifts = []
+    for day in engine.DAYS:
+        for n in range(per_day):
+            start = rng.randrange(14, 40) * 30
+            end = min(start + rng.choice([120, 180, 240, 300]), 24 * 60)
+            shifts.append((day, start, end, rng.randint(1, 5)))
+    return shifts
+
+
+def build_database(db_file, workers, workplaces=1, seed=0):
+    """Create workplaces with shifts and workers with availability, returning their names
+
+    Workers are split evenly between workplaces and written directly
+    (not through the importer, which benchmark.py times on its own).
+    """
+    migrations.migrate(db_file)
+    rng = random.Random(seed)
+
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    names = []
+    rows = roster_rows(workers, seed)
+
+    for n in range(workplaces):
+        name = f"Workplace {n + 1}"
+        hours = [value for day in engine.DAYS for value in ("06:00 AM", "12:00 AM")]
+        columns = ", ".join(f"{day.lower()}_open, {day.lower()}_close" for day in engine.DAYS)
+        c.execute(f'INSERT INTO workplaces (name, {columns}) VALUES ({", ".join("?" * 15)})',
+                  [name] + hours)
+        workplace_id = c.lastrowid
+        names.append(name)
+
+        share = workers // workplaces + (1 if n < workers % workplaces else 0)
+        c.executemany('''INSERT INTO shifts
+                        (workplace_id, day, start_time, end_time, positions, start_minute, end_minute)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                      [(workplace_id, day, TIME_LABELS[start], TIME_LABELS[end], positions, start, end)
+                       for day, start, end, positions in shift_rows(share, rng)])
+
+        availability = []
+        for _ in range(share):
+            first, last, email, work_study, *days = next(rows)
+            c.execute('''INSERT INTO workers
+                        (workplace_id, first_name, last_name, email, work_study, preferred_shifts)
+                        VALUES (?, ?, ?, ?, ?, ?)''',
+                      (workplace_id, first, last, email, work_study == "Y", rng.randint(0, 4)))
+            worker_id = c.lastrowid
+
+            for day, value in zip(engine.DAYS, days):
+                try:
+                    start, end = parse_range_minutes(value)
+                except (ValueError, AttributeError):
+                    continue
+                availability.append((worker_id, day, TIME_LABELS[start], TIME_LABELS[end], start, end))
+
+        c.executemany('''INSERT INTO availability
+                        (worker_id, day, start_time, end_time, start_minute, end_minute)
+                        VALUES (?, ?, ?, ?, ?, ?)''', availability)
+
+    conn.commit()
+    conn.close()
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m synthetic",
+                                     description="Write seeded synthetic rosters or databases")
+    parser.add_argument('roster', nargs='?', help="roster file to write (.xlsx or .csv)")
+    parser.add_argument('--db', help="database to fill with workplaces, shifts and workers")
+    parser.add_argument('--workers', type=int, default=1000, help="number of workers (default: 1000)")
+    parser.add_argument('--workplaces', type=int, default=1,
+                        help="workplaces in the database (default: 1)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args(argv)
+
+    if not args.roster and not args.db:
+        parser.error("give a roster file, --db, or both")
+
+    if args.roster:
+        write_roster(args.roster, args.workers, args.seed)
+        print(f"Wrote {args.workers} workers to {args.roster}")
+    if args.db:
+        names = build_database(args.db, args.workers, args.workplaces, args.seed)
+        print(f"Added {', '.join(names)} with {args.workers} workers to {args.db}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
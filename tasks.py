@@ -0,0 +1,102 @@
+"""Run long operations off the Tk thread and report progress back to it"""
+import threading
+import time
+
+
+class Cancelled(Exception):
+    """Raised inside a task when the user pressed Cancel"""
+
+
+class Progress:
+    """Shared between a running task and the window showing it
+
+    The task calls update() and check(); the window reads done, total,
+    message and elapsed() from the Tk thread. Plain attribute writes are
+    enough here since only the task writes them.
+    """
+
+    def __init__(self):
+        self.done = 0
+        self.total = None
+        self.message = ""
+        self.started = time.perf_counter()
+        self._cancel = threading.Event()
+
+    def update(self, done=None, total=None, message=None):
+        if total is not None:
+            self.total = total
+        if done is not None:
+            self.done = done
+        if message is not None:
+            self.message = message
+        self.check()
+
+    def check(self):
+        """Stop the task here if it has been cancelled"""
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class BackgroundTask:
+    """Run work(progress) on a thread and hand its outcome back through root.after
+
+    on_progress(progress) is called every poll while the task runs, then
+    exactly one of on_done(result), on_error(exception) or on_cancel()
+    runs on the Tk thread.
+    """
+
+    POLL_MS = 100
+
+    def __init__(self, root, work, on_done, on_error, on_cancel=None, on_progress=None):
+        self.root = root
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.on_progress = on_progress
+        self.progress = Progress()
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.root.after(self.POLL_MS, self._poll)
+        return self
+
+    def cancel(self):
+        self.progress.cancel()
+
+    def running(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        try:
+            self._result = self.work(self.progress)
+        except Exception as e:
+            self._error = e
+
+    def _poll(self):
+        if self._thread.is_alive():
+            if self.on_progress:
+                self.on_progress(self.progress)
+            self.root.after(self.POLL_MS, self._poll)
+            return
+
+        if isinstance(self._error, Cancelled):
+            if self.on_cancel:
+                self.on_cancel()
+        elif self._error is not None:
+            self.on_error(self._error)
+        else:
+            self.on_done(self._result)
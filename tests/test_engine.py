@@ -0,0 +1,22 @@
+from datetime import datetime
+
+import engine
+
+
+def test_cli_and_gui_options_share_a_fingerprint():
+    shifts = [("Monday", 9 * 60, 13 * 60, 1)]
+    availability = [(1, "Ann", "Test", False, "Monday", 8 * 60, 17 * 60)]
+    start, end = datetime(2024, 1, 7), datetime(2024, 1, 13)
+
+    def key(**options):
+        return engine.fingerprint(shifts, availability, {}, start, end, options)
+
+    for mode in engine.MODES:
+        # the CLI passes every option, unset ones as None; the GUI only the mode
+        cli = key(mode=mode, max_shifts=None, max_hours=None, slot_minutes=15)
+        assert cli == key(mode=mode)
+
+    assert key(mode='greedy', max_shifts=3) == key(mode='greedy')
+    assert key(mode='optimal', max_shifts=3) != key(mode='optimal')
+    assert key(mode='vectorized', slot_minutes=30) != key(mode='vectorized')
+    assert key(mode='optimal') != key(mode='greedy')
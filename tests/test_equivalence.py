@@ -0,0 +1,121 @@
+"""The vectorized and greedy modes agree, and the validator's sweeps match a brute-force check"""
+from collections import Counter
+from datetime import datetime, timedelta
+import random
+
+import pytest
+
+import db
+import engine
+import synthetic
+import validator
+
+
+@pytest.fixture(scope="module")
+def inputs(tmp_path_factory):
+    db_file = str(tmp_path_factory.mktemp("data") / "synthetic.db")
+    workplace = synthetic.build_database(db_file, 400, seed=3)[0]
+    conn = db.connect(db_file)
+    try:
+        yield engine.load_inputs(conn, engine.get_workplace_id(conn, workplace))
+    finally:
+        conn.close()
+
+
+def test_vectorized_matches_greedy(inputs):
+    pytest.importorskip("numpy")
+    shifts_data, availability_data = inputs
+    # a top ranked worker whose two windows meet halfway through a shift covers
+    # neither half alone, so greedy does not put them on it
+    day, start, end, positions = shifts_data[0]
+    middle = (start + end) // 2
+    split_id = max(row[0] for row in availability_data) + 1
+    availability_data = availability_data + [
+        (split_id, "Zz", "Split", True, day, start - 60, middle),
+        (split_id, "Zz", "Split", True, day, middle, end + 60),
+    ]
+
+    greedy = engine.assign_shifts(shifts_data, availability_data, mode='greedy')
+    vectorized = engine.assign_shifts(shifts_data, availability_data, mode='vectorized')
+
+    assert greedy
+    assert sorted(vectorized) == sorted(greedy)
+    assert not any(a.worker_id == split_id and a.start_time == start and a.end_time == end
+                   and a.day == day for a in vectorized)
+
+
+def brute_force(days, availability_data, hours):
+    """validator.validate's problems, found by comparing every pair"""
+    problems = []
+    windows = {}
+    for worker_id, fname, lname, work_study, day, start, end in availability_data:
+        windows.setdefault((worker_id, day), []).append((start, end))
+
+    for d in days:
+        ordered = sorted(d.assignments, key=lambda a: (a.worker_id, a.start_time, a.end_time))
+        for n, a in enumerate(ordered):
+            if any(b.worker_id == a.worker_id and a.start_time < b.end_time for b in ordered[:n]):
+                problems.append((validator.DOUBLE_BOOKED, d.date,
+                                 f"{a.name} at {engine.shift_key(a.start_time, a.end_time)} "
+                                 "overlaps another shift"))
+
+        for a in d.assignments:
+            if not any(s <= a.start_time and a.end_time <= e
+                       for s, e in windows.get((a.worker_id, d.day), ())):
+                problems.append((validator.OUTSIDE_AVAILABILITY, d.date,
+                                 f"{a.name} is not available for "
+                                 f"{engine.shift_key(a.start_time, a.end_time)}"))
+
+        for start, end in {(s, e) for s, e, count in d.shifts}:
+            count = sum(c for s, e, c in d.shifts if (s, e) == (start, end))
+            if d.day in hours:
+                open_minute, close_minute = hours[d.day]
+                minutes = range(start, end)
+                if open_minute < close_minute:
+                    inside = all(open_minute <= m < close_minute for m in minutes)
+                else:
+                    inside = (all(m >= open_minute for m in minutes)
+                              or all(m < close_minute for m in minutes))
+                if not inside:
+                    problems.append((validator.OUTSIDE_HOURS, d.date,
+                                     f"{engine.shift_key(start, end)} is outside the {d.day} opening hours"))
+
+            have = sum(1 for a in d.assignments if (a.start_time, a.end_time) == (start, end))
+            if have < count:
+                problems.append((validator.UNDERSTAFFED, d.date,
+                                 f"{engine.shift_key(start, end)} has {have} of {count} positions filled"))
+    return problems
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_validator_matches_brute_force(seed):
+    rng = random.Random(seed)
+    workers = range(8)
+    availability_data = []
+    for worker_id in workers:
+        for day in engine.DAYS:
+            for _ in range(rng.randint(0, 2)):
+                start = rng.randrange(0, 20) * 60
+                availability_data.append((worker_id, f"W{worker_id}", "Test", False, day, start,
+                                          min(start + rng.randrange(1, 10) * 60, 24 * 60)))
+
+    days = []
+    first = datetime(2026, 1, 4)
+    for n in range(7):
+        date = first + timedelta(days=n)
+        day = engine.day_name(date)
+        shifts = []
+        for _ in range(rng.randint(1, 4)):
+            start = rng.randrange(5, 21) * 60
+            shifts.append((start, min(start + rng.choice([60, 120, 180]), 24 * 60), rng.randint(1, 3)))
+        assignments = [engine.Assignment(day, start, end, worker_id, f"W{worker_id} Test")
+                       for start, end, count in shifts
+                       for worker_id in rng.sample(workers, rng.randint(0, count + 1))]
+        days.append(engine.DaySchedule(date.strftime("%Y-%m-%d"), day, tuple(shifts), assignments))
+
+    hours = {day: (rng.randrange(6, 10) * 60, rng.choice([17 * 60, 22 * 60, 2 * 60]))
+             for day in engine.DAYS if rng.random() < 0.8}
+
+    report = validator.validate(days, availability_data, hours)
+
+    assert Counter(report.problems) == Counter(brute_force(days, availability_data, hours))
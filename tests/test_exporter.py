@@ -0,0 +1,43 @@
+import json
+import os
+
+import engine
+import exporter
+
+
+def day(date, *assignments):
+    return engine.DaySchedule(date, "Monday", ((540, 720, 2),),
+                              [engine.Assignment("Monday", 540, 720, worker_id, name)
+                               for worker_id, name in assignments])
+
+
+def events(folder, filename):
+    with open(os.path.join(folder, filename)) as f:
+        return f.read().count("BEGIN:VEVENT")
+
+
+def test_ics_reexporting_one_workplace_keeps_the_others(tmp_path):
+    folder = str(tmp_path)
+    schedules = {
+        'Library': [day("2026-01-05", (1, "Ava Adams"), (2, "Ben Brown"))],
+        'Dining': [day("2026-01-05", (3, "Chloe Chen"))],
+    }
+    assert exporter.write_ics(folder, schedules) == 3
+
+    # Ben has no shifts left in the Library; Dining is not part of this export
+    assert exporter.write_ics(folder, {'Library': [day("2026-01-05", (1, "Ava Adams"))]}) == 1
+
+    assert events(folder, exporter.feed_filename(1, "Ava Adams")) == 1
+    assert events(folder, exporter.feed_filename(2, "Ben Brown")) == 0
+    assert events(folder, exporter.feed_filename(3, "Chloe Chen")) == 1
+
+    with open(os.path.join(folder, exporter.ICS_MANIFEST)) as f:
+        manifest = json.load(f)
+    assert manifest[exporter.feed_filename(3, "Chloe Chen")]['workplace'] == 'Dining'
+
+
+def test_ics_unchanged_feeds_are_not_rewritten(tmp_path):
+    folder = str(tmp_path)
+    schedules = {'Library': [day("2026-01-05", (1, "Ava Adams"))]}
+    assert exporter.write_ics(folder, schedules) == 1
+    assert exporter.write_ics(folder, schedules) == 0
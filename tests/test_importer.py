@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+openpyxl = pytest.importorskip("openpyxl")
+
+import importer
+import migrations
+
+HEADER = ['First Name', 'Last Name', 'Email', 'Monday']
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_file = str(tmp_path / "test.db")
+    migrations.migrate(db_file)
+    conn = sqlite3.connect(db_file)
+    conn.execute("INSERT INTO workplaces (name) VALUES ('Library')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def write_xlsx(filename, rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Roster"
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(filename)
+
+
+ROWS = [
+    ['Ava', 'Adams', 'ava@example.edu', '9am-5pm'],   # row 2
+    [None, None, None, None],                          # row 3, blank
+    [None, None, None, None],                          # row 4, blank
+    ['Ben', 'Brown', 'ben@example.edu', 'whenever'],  # row 5
+    ['Chloe', None, 'chloe@example.edu', '9am-5pm'],  # row 6
+    [None, None, None, None],                          # row 7, blank
+    ['Diego', 'Diaz', 'diego@example.edu', 'ask me'],  # row 8
+]
+
+
+def test_xlsx_report_points_at_the_spreadsheet_rows(conn, tmp_path):
+    filename = str(tmp_path / "roster.xlsx")
+    write_xlsx(filename, ROWS)
+
+    # small batches, so blank rows fall inside and between batches
+    report = importer.import_stream(conn, 1, filename, batch_size=2)
+
+    assert report.imported == 3
+    assert report.rejected == [("Roster row 6", "missing first name, last name or email")]
+    assert [where for where, reason in report.skipped] == ["Roster row 5", "Roster row 8"]
+
+
+def test_csv_report_points_at_the_file_lines(conn, tmp_path):
+    filename = str(tmp_path / "roster.csv")
+    lines = [",".join(HEADER)] + [",".join(value or "" for value in row) if any(row) else ""
+                                  for row in ROWS]
+    with open(filename, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+    report = importer.import_stream(conn, 1, filename, batch_size=2)
+
+    assert report.imported == 3
+    assert report.rejected == [("row 6", "missing first name, last name or email")]
+    assert [where for where, reason in report.skipped] == ["row 5", "row 8"]
+
+
+def test_report_keeps_counts_but_only_the_first_examples(conn):
+    rows = [[None, 'Nobody', f"n{n}@example.edu", None] for n in range(importer.EXAMPLES + 50)]
+    report = importer.import_frame(conn, 1, pd.DataFrame(rows, columns=HEADER))
+
+    assert report.rejected_count == importer.EXAMPLES + 50
+    assert len(report.rejected) == importer.EXAMPLES
+    assert report.rejected[0][0] == "row 2"
+    assert f"Rejected {importer.EXAMPLES + 50} rows" in report.summary()
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pytest
+
+import incremental
+import tasks
+
+# a Sunday
+SUNDAY = datetime(2026, 1, 4)
+
+
+def test_balanced_refill_respects_hour_caps():
+    shifts = [("Sunday", 9 * 60, 13 * 60, 1), ("Monday", 9 * 60, 13 * 60, 1)]
+    availability = [(1, "Ava", "Adams", True, day, 8 * 60, 18 * 60) for day in ("Sunday", "Monday")]
+    availability.append((2, "Ben", "Brown", False, "Monday", 8 * 60, 18 * 60))
+    saved = {"2026-01-04": [(9 * 60, 13 * 60, 1, "Ava Adams")]}
+
+    greedy = incremental.repair_range(shifts, availability, SUNDAY, SUNDAY, {}, saved)
+    assert not greedy.added and not greedy.removed
+
+    # greedy ignores hour caps and ranks the work study student first
+    monday = datetime(2026, 1, 5)
+    greedy = incremental.repair_range(shifts, availability, SUNDAY, monday, {}, saved, max_hours=4)
+    assert [change.worker_id for change in greedy.added] == [1]
+
+    balanced = incremental.repair_range(shifts, availability, SUNDAY, monday, {}, saved,
+                                        mode='balanced', max_hours=4)
+    assert [change.worker_id for change in balanced.added] == [2]
+
+    balanced = incremental.repair_range(shifts, availability, SUNDAY, monday, {}, saved,
+                                        mode='balanced', limits={1: (0, None), 2: (0, 0)},
+                                        max_hours=4)
+    assert balanced.added == []
+
+
+def test_repair_reports_progress_and_can_be_cancelled():
+    shifts = [("Sunday", 9 * 60, 13 * 60, 1), ("Monday", 9 * 60, 13 * 60, 1)]
+    availability = [(1, "Ava", "Adams", True, day, 8 * 60, 18 * 60) for day in ("Sunday", "Monday")]
+    monday = datetime(2026, 1, 5)
+
+    progress = tasks.Progress()
+    result = incremental.repair_range(shifts, availability, SUNDAY, monday, {}, {}, progress=progress)
+    assert len(result.added) == 2
+    assert (progress.done, progress.total) == (2, 2)
+
+    progress = tasks.Progress()
+    progress.cancel()
+    with pytest.raises(tasks.Cancelled):
+        incremental.repair_range(shifts, availability, SUNDAY, monday, {}, {}, progress=progress)
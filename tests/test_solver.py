@@ -0,0 +1,101 @@
+import random
+
+import engine
+
+
+def all_day(*worker_ids, day="Monday"):
+    return [(worker_id, f"Worker{worker_id}", "Test", False, day, 0, 24 * 60) for worker_id in worker_ids]
+
+
+def filled(assignments):
+    return len(assignments)
+
+
+def double_booked(assignments):
+    """(worker, day) pairs with two overlapping shifts"""
+    by_worker = {}
+    for a in assignments:
+        by_worker.setdefault((a.worker_id, a.day), []).append((a.start_time, a.end_time))
+    return [key for key, shifts in by_worker.items()
+            if any(s1 < e2 and s2 < e1
+                   for n, (s1, e1) in enumerate(shifts) for s2, e2 in shifts[n + 1:])]
+
+
+def test_optimal_fills_chained_handover_shifts():
+    shifts = [("Monday", 8 * 60, 12 * 60, 1), ("Monday", 11 * 60, 15 * 60, 1),
+              ("Monday", 14 * 60, 18 * 60, 1), ("Monday", 17 * 60, 21 * 60, 1)]
+    availability = all_day(1, 2)
+
+    greedy = engine.assign_shifts(shifts, availability, mode='greedy')
+    optimal = engine.assign_shifts(shifts, availability, mode='optimal')
+
+    assert filled(optimal) >= filled(greedy) == 4
+    assert not double_booked(optimal)
+
+
+def test_optimal_matches_greedy_without_overlaps():
+    # shifts of a day never overlap, so greedy cannot double-book either
+    rng = random.Random(1)
+    shifts = [(day, start * 60, (start + 3) * 60, rng.randint(1, 3))
+              for day in engine.DAYS for start in (6, 9, 12, 15, 18)]
+    availability = []
+    for worker_id in range(30):
+        for day in rng.sample(engine.DAYS, 3):
+            start = rng.randrange(6, 18)
+            availability.append((worker_id, f"W{worker_id}", "Test", rng.random() < 0.3,
+                                 day, start * 60, min(start + rng.randrange(3, 12), 24) * 60))
+
+    greedy = engine.assign_shifts(shifts, availability, mode='greedy')
+    optimal = engine.assign_shifts(shifts, availability, mode='optimal')
+
+    assert filled(optimal) >= filled(greedy)
+    assert not double_booked(optimal)
+
+
+def test_optimal_never_double_books_overlapping_shifts():
+    rng = random.Random(2)
+    for _ in range(20):
+        shifts = []
+        for _ in range(8):
+            start = rng.randrange(6, 20) * 60
+            shifts.append(("Monday", start, min(start + rng.choice([120, 180, 240]), 24 * 60),
+                           rng.randint(1, 3)))
+        availability = []
+        for worker_id in range(6):
+            start = rng.randrange(6, 14) * 60
+            availability.append((worker_id, f"W{worker_id}", "Test", rng.random() < 0.5,
+                                 "Monday", start, min(start + rng.randrange(4, 14) * 60, 24 * 60)))
+
+        optimal = engine.assign_shifts(shifts, availability, mode='optimal', max_shifts=3)
+
+        assert not double_booked(optimal)
+        per_worker = {}
+        for a in optimal:
+            per_worker[a.worker_id] = per_worker.get(a.worker_id, 0) + 1
+        assert max(per_worker.values(), default=0) <= 3
+
+
+def test_optimal_moves_shifts_to_fill_more():
+    # the flow gives W1 one of the two overlapping afternoon shifts only;
+    # the best is W0 on 9-13 and 12-16, W1 on 15-19 (3 positions)
+    shifts = [("Monday", 9 * 60, 13 * 60, 1), ("Monday", 15 * 60, 19 * 60, 2),
+              ("Monday", 12 * 60, 16 * 60, 2)]
+    availability = [(0, "W0", "Test", False, "Monday", 9 * 60, 17 * 60),
+                    (1, "W1", "Test", False, "Monday", 9 * 60, 22 * 60)]
+
+    optimal = engine.assign_shifts(shifts, availability, mode='optimal', max_shifts=2)
+
+    assert filled(optimal) == 3
+    assert not double_booked(optimal)
+
+
+def test_greedy_puts_a_worker_on_a_shift_once():
+    # Ava's two windows both cover the shift, Ben's one does too
+    shifts = [("Monday", 10 * 60, 12 * 60, 2)]
+    availability = [(1, "Ava", "Adams", True, "Monday", 8 * 60, 13 * 60),
+                    (1, "Ava", "Adams", True, "Monday", 9 * 60, 17 * 60),
+                    (2, "Ben", "Brown", False, "Monday", 9 * 60, 17 * 60)]
+
+    for mode in ('greedy', 'optimal', 'balanced'):
+        assignments = engine.assign_shifts(shifts, availability, mode=mode)
+        assert sorted(a.worker_id for a in assignments) == [1, 2], mode
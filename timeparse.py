@@ -0,0 +1,140 @@
+"""Time parsing for roster strings like '2 pm - 12 am', with a memo cache
+
+Roster spreadsheets repeat the same few dozen availability strings
+thousands of times, so parsed ranges are kept in a bounded LRU cache
+and whole columns are parsed once per distinct value.
+"""
+from datetime import datetime
+from functools import lru_cache
+import re
+
+# how many distinct range strings to remember
+CACHE_SIZE = 4096
+
+TO_SEPARATOR = re.compile(r'\s+to\s+')
+WITH_AMPM = re.compile(r'(\d+)(?::(\d+))?\s*(am|pm)')
+WITHOUT_AMPM = re.compile(r'(\d+)(?::(\d+))?')
+
+
+def time_to_minutes(time_str, end=False):
+    """Convert a time string like '02:00 PM' to minutes since midnight
+
+    Midnight as an end time ('12:00 AM') means the end of the day, 1440.
+    """
+    dt = datetime.strptime(time_str.strip(), "%I:%M %p")
+    minutes = dt.hour * 60 + dt.minute
+    if end and minutes == 0:
+        return 24 * 60
+    return minutes
+
+
+def minutes_to_time(minutes):
+    """Convert minutes since midnight back to the 'HH:MM AM/PM' display format"""
+    return TIME_LABELS[minutes]
+
+
+def _label(minutes):
+    hour = (minutes // 60) % 24
+    return f"{(hour + 11) % 12 + 1:02d}:{minutes % 60:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+# display string for every minute of the day, plus 1440 for midnight as an end time
+TIME_LABELS = [_label(m) for m in range(24 * 60 + 1)]
+
+
+def _parse_side(part):
+    """Minutes for one side of a range, or None if it cannot be read"""
+    match = WITH_AMPM.search(part)
+    if match:
+        ampm = match.group(3)
+    else:
+        # try without am/pm
+        match = WITHOUT_AMPM.search(part)
+        if not match:
+            return None
+        ampm = "am" if int(match.group(1)) < 12 else "pm"
+
+    hour = int(match.group(1))
+    minute = match.group(2) or "00"
+
+    # the same limits strptime('%I:%M %p') enforces
+    if not 1 <= hour <= 12 or len(minute) > 2 or int(minute) > 59:
+        return None
+
+    return ((hour % 12) + (12 if ampm == "pm" else 0)) * 60 + int(minute)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(time_str):
+    """Parse a range to (start, end) minutes, or (None, error message)"""
+    text = time_str.strip().lower()
+
+    # split into start and end times
+    if '-' in text:
+        parts = text.split('-')
+    else:
+        parts = TO_SEPARATOR.split(text)
+
+    if len(parts) < 2:
+        return None, f"Cannot find start and end times in: {time_str}"
+
+    start = _parse_side(parts[0].strip())
+    if start is None:
+        return None, f"Cannot parse start time: {parts[0].strip()}"
+
+    end = _parse_side(parts[1].strip())
+    if end is None:
+        return None, f"Cannot parse end time: {parts[1].strip()}"
+
+    return start, end or 24 * 60
+
+
+def parse_range_minutes(time_str):
+    """Parse a range like '2 pm - 12 am' to (start, end) minutes since midnight
+
+    Midnight as an end time comes back as 1440. Raises ValueError when
+    the string cannot be read.
+    """
+    start, end = _parse(time_str)
+    if start is None:
+        raise ValueError(end)
+    return start, end
+
+
+def parse_time_range(time_str):
+    """Parse time range from format like '2 pm - 12 am' to standard 12-hour format"""
+    start, end = parse_range_minutes(time_str)
+    return TIME_LABELS[start], TIME_LABELS[end]
+
+
+def parse_series(values):
+    """Parse a whole pandas Series of range strings
+
+    Each distinct value is parsed once. Returns NumPy arrays
+    (start minutes, end minutes, error mask); entries flagged in the
+    mask hold -1.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(values.astype(str), use_na_sentinel=True)
+
+    parsed = [_parse(value) for value in uniques]
+    starts = np.array([-1 if s is None else s for s, e in parsed] + [-1], dtype=np.int64)
+    ends = np.array([-1 if s is None else e for s, e in parsed] + [-1], dtype=np.int64)
+
+    # NaN codes are -1, which picks the trailing "error" entry
+    start = starts[codes]
+    end = ends[codes]
+    return start, end, start < 0
+
+
+def cache_info():
+    """Hit/miss counters of the range cache as a dict"""
+    info = _parse.cache_info()
+    return {'hits': info.hits, 'misses': info.misses,
+            'size': info.currsize, 'maxsize': info.maxsize}
+
+
+def clear_cache():
+    _parse.cache_clear()
@@ -0,0 +1,191 @@
+"""A ttk.Treeview that only creates the rows it shows
+
+Tk slows down badly with tens of thousands of Treeview items, so
+VirtualTable keeps the data in a Python list and the tree holds one item
+per visible line. Scrolling rewrites those few items with the rows now
+in view, and set_rows() compares the new rows with the old ones by key,
+touching only visible items whose row changed.
+
+    table = VirtualTable(parent, columns=("id", "Name"), key=lambda row: row[0])
+    table.heading("id", text="ID")
+    table.set_rows(rows)
+"""
+import tkinter as tk
+from tkinter import ttk
+
+import instrument
+
+# used when the theme does not say how tall a row is
+DEFAULT_ROW_HEIGHT = 20
+
+
+class VirtualTable(ttk.Frame):
+    """A scrollable table of rows (tuples) drawing only the visible ones"""
+
+    def __init__(self, parent, columns, key=None, xscroll=False, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.key = key or (lambda row: row[0])
+        self._rows = []
+        self._index = {}
+        self._first = 0
+        self._visible = 1
+        self._slots = []      # tree items, one per visible line
+        self._shown = []      # row each slot shows right now
+        self._selected = set()
+        self._rendering = False
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode='extended')
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        if xscroll:
+            x_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+            self.tree.config(xscrollcommand=x_scrollbar.set)
+            x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<Configure>', self._resized)
+        self.tree.bind('<<TreeviewSelect>>', self._selection_changed)
+        self.tree.bind('<MouseWheel>', self._wheel)
+        self.tree.bind('<Button-4>', lambda event: self._scroll(-3))
+        self.tree.bind('<Button-5>', lambda event: self._scroll(3))
+        self.tree.bind('<Up>', lambda event: self._move(-1))
+        self.tree.bind('<Down>', lambda event: self._move(1))
+        self.tree.bind('<Prior>', lambda event: self._move(-self._visible))
+        self.tree.bind('<Next>', lambda event: self._move(self._visible))
+        self.tree.bind('<Home>', lambda event: self._move(-len(self._rows)))
+        self.tree.bind('<End>', lambda event: self._move(len(self._rows)))
+
+    def heading(self, column, **kwargs):
+        return self.tree.heading(column, **kwargs)
+
+    def column(self, column, **kwargs):
+        return self.tree.column(column, **kwargs)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def set_rows(self, rows):
+        """Show rows instead of the current ones; returns (inserted, removed, changed)
+
+        The view stays on the row that was at the top if it is still
+        there, selected rows stay selected, and only visible lines whose
+        row differs are redrawn.
+        """
+        rows = list(rows)
+        index = {self.key(row): n for n, row in enumerate(rows)}
+
+        old_index = self._index
+        inserted = sum(1 for key in index if key not in old_index)
+        removed = sum(1 for key in old_index if key not in index)
+        changed = sum(1 for key, n in index.items()
+                      if key in old_index and self._rows[old_index[key]] != rows[n])
+
+        top = self.key(self._rows[self._first]) if self._first < len(self._rows) else None
+        self._rows = rows
+        self._index = index
+        self._first = index.get(top, min(self._first, len(rows)))
+        self._selected = {key for key in self._selected if key in index}
+
+        self._render()
+        instrument.count('rows changed', inserted + removed + changed)
+        return inserted, removed, changed
+
+    def clear(self):
+        self.set_rows([])
+
+    def selected_rows(self):
+        """The selected rows, in table order"""
+        return [self._rows[n] for n in sorted(self._index[key] for key in self._selected)]
+
+    def see(self, n):
+        """Scroll so that row n is visible"""
+        if n < self._first:
+            self._first = n
+        elif n >= self._first + self._visible:
+            self._first = n - self._visible + 1
+        self._render()
+
+    def yview(self, *args):
+        """Scrollbar protocol: ('moveto', fraction) or ('scroll', n, 'units'|'pages')"""
+        if not args:
+            return self._fractions()
+        if args[0] == 'moveto':
+            self._first = int(float(args[1]) * len(self._rows))
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (self._visible if args[2] == 'pages' else 1)
+            self._first += step
+        self._render()
+
+    def _fractions(self):
+        if not self._rows:
+            return 0.0, 1.0
+        return self._first / len(self._rows), min(1.0, (self._first + self._visible) / len(self._rows))
+
+    def _render(self):
+        count = len(self._rows)
+        self._first = max(0, min(self._first, count - self._visible))
+        lines = min(self._visible, count - self._first)
+
+        self._rendering = True
+        try:
+            while len(self._slots) < lines:
+                self._slots.append(self.tree.insert('', 'end'))
+                self._shown.append(None)
+            while len(self._slots) > lines:
+                self.tree.delete(self._slots.pop())
+                self._shown.pop()
+
+            selection = []
+            for n, item in enumerate(self._slots):
+                row = self._rows[self._first + n]
+                if self._shown[n] is not row and self._shown[n] != row:
+                    self.tree.item(item, values=row)
+                self._shown[n] = row
+                if self.key(row) in self._selected:
+                    selection.append(item)
+            self.tree.selection_set(selection)
+        finally:
+            self._rendering = False
+
+        self.scrollbar.set(*self._fractions())
+
+    def _resized(self, event):
+        style = ttk.Style(self)
+        row_height = int(style.lookup('Treeview', 'rowheight') or DEFAULT_ROW_HEIGHT)
+        # the heading takes about one row
+        visible = max(1, event.height // row_height - 1)
+        if visible != self._visible:
+            self._visible = visible
+            self._render()
+
+    def _selection_changed(self, event):
+        if self._rendering:
+            return
+        # lines scrolled out of view keep their selection; the visible ones are read back
+        shown = {self.key(row) for row in self._shown}
+        self._selected -= shown
+        self._selected |= {self.key(self._shown[self._slots.index(item)])
+                           for item in self.tree.selection()}
+
+    def _wheel(self, event):
+        # Windows reports multiples of 120, macOS small steps
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll(-3 * delta)
+
+    def _scroll(self, lines):
+        self._first += lines
+        self._render()
+        return "break"
+
+    def _move(self, step):
+        """Move the selection (or the view) by step rows, keeping it in view"""
+        if not self._rows:
+            return "break"
+        current = [self._index[key] for key in self._selected]
+        n = (max(current) if step > 0 else min(current)) + step if current else self._first
+        n = max(0, min(n, len(self._rows) - 1))
+        self._selected = {self.key(self._rows[n])}
+        self.see(n)
+        self.tree.event_generate('<<TreeviewSelect>>')
+        return "break"